@@ -1,19 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, abort, current_app, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, abort, current_app, jsonify, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from models import db, User, Player, Match, Product, Sponsor, Cart, CartItem, News, Order
-from werkzeug.security import generate_password_hash, check_password_hash
+from cache import init_cache, cached_page, cached_value, model_version, bump_version, CachedMapping, DEFAULT_TTL
+from migrations import upgrade_database
+from db_profile import configure_database, init_database_profile, read_replica
+import cart_service
+import session_cart
+import checkout_service
+import images
+import search
+import bulk_io
+import stats
+import security
+import assets
+import feeds
+import metrics
+import logs
 from werkzeug.utils import secure_filename
-from functools import wraps
+from werkzeug.middleware.proxy_fix import ProxyFix
+from functools import partial, wraps
+from collections import namedtuple
+from zoneinfo import ZoneInfo
+from urllib.parse import urlsplit
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 import os
+import base64
 import datetime
+import hashlib
+import json
+import math
 import secrets
+import tempfile
+import click
 from flask_wtf.csrf import CSRFProtect 
 # ----------------------------------------------------
 
 # ============================================
 # CONFIGURAÇÃO DA APLICAÇÃO
 # ============================================
-app = Flask(__name__)
+# INSTANCE_PATH (opcional, caminho absoluto) troca a pasta instance/, onde
+# ficam as versões do cache e as métricas (ex.: nos testes de carga)
+app = Flask(__name__, instance_path=os.environ.get("INSTANCE_PATH"))
+
+# Proxies na frente do app (o roteador do Heroku é 1): quantos saltos do
+# X-Forwarded-For/-Proto são confiáveis para achar o IP e o esquema do
+# cliente (o limitador de login é por IP). 0 = app exposto direto.
+app.config["TRUSTED_PROXIES"] = int(os.environ.get("TRUSTED_PROXIES", "1"))
+if app.config["TRUSTED_PROXIES"]:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"], x_proto=app.config["TRUSTED_PROXIES"])
 
 # Diretório de uploads
 UPLOAD_ROOT = os.path.join('static', 'uploads')
@@ -26,54 +61,395 @@ app_dir = os.path.abspath(os.path.dirname(__file__))
 db_path = os.path.join(app_dir, "instance", "site.db")
 
 # SQLAlchemy
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", f"sqlite:///{db_path}")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+# Perfil do SQLite (WAL, busy_timeout, cache...) e pool de conexões.
+# DATABASE_REPLICA_URL (opcional) recebe as leituras das páginas públicas,
+# ex.: "sqlite:///file:site.db?mode=ro&uri=true" (relativo a instance/)
+configure_database(app, replica_uri=os.environ.get("DATABASE_REPLICA_URL"))
 app.config["SECRET_KEY"] = "uma_chave_secreta_super_segura"
 
+# Carrinho: "session" (cookie assinado, gravado no banco depois) ou "database"
+app.config["CART_STORAGE"] = "session"
+app.config["CART_FLUSH_INTERVAL"] = 30  # segundos entre gravações do carrinho da sessão
+app.config["CART_MAX_ITEMS"] = 50  # produtos diferentes (mantém o cookie pequeno)
+app.config["STATS_SUMMARY_TABLE"] = True  # contadores do dashboard mantidos por triggers (stats.py)
+
+# Senhas: algoritmo/custo do hash (hashes antigos são refeitos no login)
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", security.DEFAULT_HASH_METHOD)
+# Tentativas de login: (fichas, segundos para recarregar todas) por IP e por (IP, e-mail)
+app.config["LOGIN_RATE_LIMIT_IP"] = (20, 60)
+app.config["LOGIN_RATE_LIMIT_EMAIL"] = (5, 300)
+# Usuário logado guardado em memória (segundos); commits em User invalidam antes
+app.config["USER_CACHE_TTL"] = 60
+# Fuso das datas/horas das partidas cadastradas no admin (Match.starts_at)
+app.config["MATCH_TIMEZONE"] = "America/Sao_Paulo"
+# Endereço público usado na URL e nos UIDs do .ics (ex.: "https://royalehub.com.br");
+# sem ele vale o host de cada requisição (um .ics em cache por host)
+app.config["FEEDS_BASE_URL"] = os.environ.get("FEEDS_BASE_URL")
+
+# Métricas (/metrics): limite de queries por requisição antes do alarme de
+# N+1 (com exceções por endpoint) e o token exigido do Prometheus (sem ele
+# o /metrics só responde em modo debug)
+app.config["METRICS_QUERY_ALARM"] = 20
+app.config["METRICS_QUERY_BUDGETS"] = {"api_cart": 3, "agenda": 3, "home": 10}
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+
+# Logs em JSON via fila (ver logs.py). LOG_SAMPLING: {endpoint: {nível: fração}}
+app.config["LOG_LEVEL"] = os.environ.get("LOG_LEVEL", "INFO")
+app.config["LOG_SAMPLING"] = {
+    "api_cart": {"INFO": 0.01},
+    "update_cart_quantity": {"INFO": 0.1},
+    "add_to_cart": {"INFO": 0.1},
+    "static": {"INFO": 0.0},
+    "asset": {"INFO": 0.0},
+}
+logs.init_logging(app)
+
 csrf = CSRFProtect(app)
 
 # Inicializa o banco
 db.init_app(app)
+init_database_profile(app, db)
+
+# Cache de páginas versionado (invalidado nos commits do admin)
+init_cache(app)
+
+# Latência, queries SQL e render de templates por endpoint (ver metrics.py)
+metrics.init_metrics(app)
+metrics.register_source("log_records_dropped_total", logs.dropped_records)
 
 # Cria as tabelas se não existirem
 with app.app_context():
     os.makedirs(os.path.dirname(db_path), exist_ok=True)  # garante que a pasta exista
     db.create_all()
-    print("Tabelas criadas com sucesso!")
+    upgrade_database(db.engine)  # cria índices que faltam em bancos antigos
+    search.init_search(db.engine)  # índice FTS5 da busca (mantido por triggers)
+    stats.init_stats(db.engine)  # contadores e faturamento diário do dashboard
+    feeds.init_feeds(db.engine)  # partidas apagadas para o /api/matches?since=
+    app.logger.info("Tabelas criadas/verificadas")
+
+# Campos da edição em massa do admin (templates/admin/_bulk_actions.html)
+app.jinja_env.globals["bulk_edit_fields"] = bulk_io.BULK_EDIT_FIELDS
+
+# Versões redimensionadas das imagens (srcset) disponíveis nos templates
+app.jinja_env.globals["responsive_image"] = partial(images.responsive_image, app.static_folder)
+
+# CSS/JS com hash gerados por 'flask construir-assets' (templates/_assets.html)
+assets.init_assets(app)
+app.jinja_env.globals["asset_url"] = assets.asset_url
 
 # Inicializa Login Manager
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"  # se tentar acessar rota protegida sem login
 
+# ============================================
+# PATROCINADORES (CACHE POR PROCESSO)
+# ============================================
+# A lista de patrocinadores aparece no rodapé de todas as páginas. Ela fica em
+# memória por até SPONSORS_CACHE_TTL segundos e é descartada assim que a versão
+# do modelo Sponsor muda (commit em qualquer worker, ver cache.py).
+SPONSORS_CACHE_TTL = 300
+
+# Cópia simples dos campos usados nos templates (não expira com a sessão do banco)
+SponsorInfo = namedtuple("SponsorInfo", ["id", "name", "logo_file", "website"])
+
+@cached_value("Sponsor", ttl=SPONSORS_CACHE_TTL)
+def cached_sponsors():
+    return [
+        SponsorInfo(s.id, s.name, s.logo_file, s.website)
+        for s in Sponsor.query.order_by(Sponsor.id).all()
+    ]
+
 # Injeta os patrocinadores globalmente
 @app.context_processor
 def inject_global_data():
     try:
-        sponsors_list = Sponsor.query.all()
+        sponsors_list = cached_sponsors.get()
     except:
         sponsors_list = []
         
     return dict(sponsors=sponsors_list)
 
+# ============================================
+# PAGINAÇÃO DE NOTÍCIAS (CURSOR / KEYSET)
+# ============================================
+HOME_NEWS_LIMIT = 5
+NEWS_PAGE_SIZE = 10
+NEWS_PAGE_SIZE_MAX = 50
+
+def latest_news_query():
+    """Notícias da mais recente para a mais antiga (usa ix_news_created_at_id)."""
+    return News.query.order_by(News.created_at.desc(), News.id.desc())
+
+def encode_cursor(item, column="created_at"):
+    """Gera o cursor opaco (created_at + id) do último item de uma página."""
+    raw = f"{getattr(item, column).isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decodifica o cursor; retorna None se for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, item_id = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, UnicodeError, AttributeError):
+        return None
+
+def paginate_by_cursor(query, model, cursor=None, limit=NEWS_PAGE_SIZE, column="created_at", descending=True):
+    """
+    Retorna (itens, próximo_cursor) de uma query ordenada por
+    (created_at DESC, id DESC), começando logo após o cursor.
+    Com column/descending serve para outras ordens (ex.: starts_at ASC, id ASC).
+    Busca limit + 1 linhas só para saber se existe uma próxima página.
+    Linhas com a coluna NULL (ex.: registros antigos sem created_at) ficam
+    de fora: a comparação de tuplas não as ordena e elas não geram cursor.
+    """
+    query = query.filter(getattr(model, column).isnot(None))
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        key = tuple_(getattr(model, column), model.id)
+        query = query.filter(key < position if descending else key > position)
+
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1], column) if len(rows) > limit else None
+    return page, next_cursor
+
+def paginate_news(cursor=None, limit=NEWS_PAGE_SIZE):
+    """Página de notícias a partir do cursor (ver paginate_by_cursor)."""
+    return paginate_by_cursor(latest_news_query(), News, cursor, limit)
+
+# ============================================
+# CATÁLOGO DA LOJA (FILTROS / ORDEM / PÁGINAS)
+# ============================================
+HOME_PRODUCTS_LIMIT = 4
+SHOP_PAGE_SIZE = 12
+
+# ?ordem= -> ORDER BY (sempre termina no id para a ordem ser estável entre páginas)
+SHOP_SORTS = {
+    "recentes": (Product.id.desc(),),
+    "menor_preco": (Product.price.asc(), Product.id.asc()),
+    "maior_preco": (Product.price.desc(), Product.id.desc()),
+    "avaliacao": (Product.rating.desc(), Product.reviews.desc(), Product.id.desc()),
+}
+SHOP_DEFAULT_SORT = "recentes"
+SHOP_MAX_PAGE = 1000  # ?pagina= maior que isso vira a última permitida (o OFFSET cabe no SQLite)
+
+def featured_products():
+    """Só os produtos que a home mostra (em vez do catálogo inteiro)."""
+    return Product.query.order_by(Product.id.asc()).limit(HOME_PRODUCTS_LIMIT).all()
+
+def _float_arg(name):
+    try:
+        value = float(request.args[name])
+    except (KeyError, ValueError):
+        return None
+    return value if math.isfinite(value) else None  # nan/inf não filtram nada
+
+def shop_filters():
+    """Lê os filtros da query string, ignorando valores inválidos."""
+    sort = request.args.get("ordem", SHOP_DEFAULT_SORT)
+    try:
+        page = min(max(int(request.args.get("pagina", 1)), 1), SHOP_MAX_PAGE)
+    except ValueError:
+        page = 1
+    return {
+        "tag": request.args.get("tag") or None,
+        "preco_min": _float_arg("preco_min"),
+        "preco_max": _float_arg("preco_max"),
+        "nota_min": _float_arg("nota_min"),
+        "ordem": sort if sort in SHOP_SORTS else SHOP_DEFAULT_SORT,
+        "pagina": page,
+    }
+
+def paginate_products(filters, per_page=SHOP_PAGE_SIZE):
+    """
+    Aplica os filtros no SQL e retorna (produtos, tem_próxima_página).
+    Busca per_page + 1 linhas só para saber se existe uma próxima página.
+    """
+    query = Product.query
+    if filters["tag"]:
+        query = query.filter(Product.tag == filters["tag"])
+    if filters["preco_min"] is not None:
+        query = query.filter(Product.price >= filters["preco_min"])
+    if filters["preco_max"] is not None:
+        query = query.filter(Product.price <= filters["preco_max"])
+    if filters["nota_min"] is not None:
+        query = query.filter(Product.rating >= filters["nota_min"])
+
+    rows = (
+        query.order_by(*SHOP_SORTS[filters["ordem"]])
+        .offset((filters["pagina"] - 1) * per_page)
+        .limit(per_page + 1)
+        .all()
+    )
+    return rows[:per_page], len(rows) > per_page
+
+def product_tags():
+    """Tags distintas para o filtro (lidas do índice ix_product_tag_price)."""
+    return [tag for (tag,) in db.session.query(Product.tag).filter(Product.tag.isnot(None)).distinct().order_by(Product.tag)]
+
+# ============================================
+# AGENDA (PRÓXIMAS PARTIDAS / ANTERIORES)
+# ============================================
+# Próximas = starts_at >= agora (ASC) e anteriores = starts_at < agora (DESC),
+# as duas lidas por range scan em ix_match_starts_at_id. A primeira página de
+# cada lista fica em cache até a próxima partida começar (quando ela passa de
+# "próxima" para "anterior") ou até um commit em Match.
+HOME_MATCHES_LIMIT = 5
+AGENDA_PAGE_SIZE = 20
+
+MatchInfo = namedtuple("MatchInfo", ["id", "tournament", "opponent", "date", "time", "starts_at"])
+MatchSchedule = namedtuple("MatchSchedule", ["upcoming", "past"])
+
+def local_now():
+    """Agora no fuso das partidas, sem tzinfo (como Match.starts_at)."""
+    return datetime.datetime.now(ZoneInfo(app.config["MATCH_TIMEZONE"])).replace(tzinfo=None)
+
+def matches_query(upcoming, now):
+    """Partidas a partir de 'now' (upcoming) ou antes dele, na ordem da agenda."""
+    query = db.session.query(
+        Match.id, Match.tournament, Match.opponent, Match.date, Match.time, Match.starts_at
+    )
+    if upcoming:
+        return query.filter(Match.starts_at >= now).order_by(Match.starts_at.asc(), Match.id.asc())
+    return query.filter(Match.starts_at < now).order_by(Match.starts_at.desc(), Match.id.desc())
+
+def paginate_matches(upcoming, cursor=None, now=None):
+    """Página de partidas futuras/anteriores a partir do cursor (starts_at + id)."""
+    rows, next_cursor = paginate_by_cursor(
+        matches_query(upcoming, now or local_now()), Match, cursor, AGENDA_PAGE_SIZE,
+        column="starts_at", descending=not upcoming,
+    )
+    return [MatchInfo(*row) for row in rows], next_cursor
+
+def _seconds_until_next_start(schedule):
+    """Validade do cache: até a próxima partida começar."""
+    upcoming, _ = schedule.upcoming
+    if not upcoming:
+        return DEFAULT_TTL
+    return max(1.0, (upcoming[0].starts_at - local_now()).total_seconds())
+
+@cached_value("Match", ttl=_seconds_until_next_start)
+def match_schedule():
+    """Primeira página (itens, próximo_cursor) das próximas partidas e das anteriores."""
+    now = local_now()
+    return MatchSchedule(paginate_matches(True, now=now), paginate_matches(False, now=now))
+
+def home_matches():
+    upcoming, _ = match_schedule.get().upcoming
+    return upcoming[:HOME_MATCHES_LIMIT]
+
+# ============================================
+# FEEDS DA AGENDA (.ics / JSON)
+# ============================================
+# Gerados uma vez por versão de Match (commit no admin, importação, edição
+# em massa) e servidos da memória. A mesma versão vira ETag/Last-Modified:
+# quem consulta com If-None-Match/If-Modified-Since recebe 304 sem corpo.
+FEEDS_CACHE_TTL = 24 * 3600
+FEEDS_MAX_HOSTS = 8  # .ics guardados por host quando FEEDS_BASE_URL não está definido
+
+@cached_value("Match", ttl=FEEDS_CACHE_TTL)
+def match_feed_json():
+    return feeds.render_json(ZoneInfo(app.config["MATCH_TIMEZONE"]))
+
+def _render_agenda_ics(base_url):
+    return feeds.render_ics(
+        ZoneInfo(app.config["MATCH_TIMEZONE"]),
+        base_url + url_for("agenda"),
+        urlsplit(base_url).hostname,
+    )
+
+agenda_ics_by_host = CachedMapping(
+    _render_agenda_ics, ("Match",), ttl=FEEDS_CACHE_TTL, max_entries=FEEDS_MAX_HOSTS
+)
+
+def feed_base_url():
+    """Esquema + host das URLs do .ics: o configurado ou o da requisição."""
+    return (app.config["FEEDS_BASE_URL"] or f"{request.scheme}://{request.host}").rstrip("/")
+
+def feed_validators():
+    """(ETag, Last-Modified) a partir da versão de Match (sem tocar no banco)."""
+    version = model_version("Match")
+    # O Last-Modified tem resolução de segundos: arredonda para cima, para
+    # nunca ficar antes da mudança (feed_response só o envia depois dele)
+    last_modified = datetime.datetime.fromtimestamp(-(-version // 10**9), datetime.timezone.utc)
+    return f"matches-{version}", last_modified
+
+def feed_response(etag, last_modified, build, mimetype):
+    """Responde 304 se o cliente já tem esta versão; senão o corpo de build()."""
+    not_modified = request.if_none_match.contains(etag) or (
+        not request.if_none_match
+        and request.if_modified_since is not None
+        and request.if_modified_since >= last_modified
+    )
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(build(), mimetype=mimetype)
+    response.set_etag(etag)
+    # Enquanto o segundo do Last-Modified não acabou, outra mudança ainda
+    # pode cair nele: sem o cabeçalho, o cliente não manda um If-Modified-Since
+    # que depois serviria de 304 para a versão nova (o ETag continua valendo)
+    if last_modified <= datetime.datetime.now(datetime.timezone.utc):
+        response.last_modified = last_modified
+    # Caches podem guardar, mas sempre revalidam (o 304 é barato)
+    response.headers["Cache-Control"] = "public, no-cache"
+    return response
+
+@app.route("/agenda.ics")
+@read_replica
+def agenda_ics():
+    """Calendário com todas as partidas (assinável no Google Agenda, Outlook...)."""
+    etag, last_modified = feed_validators()
+    return feed_response(etag, last_modified, lambda: agenda_ics_by_host.get(feed_base_url()), "text/calendar")
+
+@app.route("/api/matches")
+@read_replica
+def api_matches():
+    """
+    Todas as partidas em JSON. Com ?since=<next_since da resposta anterior>
+    vêm só as partidas alteradas/criadas depois disso e os ids apagados.
+    """
+    etag, last_modified = feed_validators()
+    since = request.args.get("since")
+    if not since:
+        return feed_response(etag, last_modified, match_feed_json.get, "application/json")
+
+    try:
+        since = feeds.parse_since(since)
+    except ValueError:
+        abort(400)
+    timezone = ZoneInfo(app.config["MATCH_TIMEZONE"])
+    return feed_response(
+        f"{etag}-{since.isoformat()}", last_modified,
+        lambda: json.dumps(feeds.changes_since(since, timezone), ensure_ascii=False),
+        "application/json",
+    )
+
 # ============================================
 # ROTAS PRINCIPAIS DO SITE
 # ============================================
 
 @app.route("/")
+@read_replica
+@cached_page("News", "Player", "Match", "Product", "Sponsor", version=home_matches)
 def home():
     from models import News, Player, Match, Product, Sponsor, News
 
-    all_news = News.query.order_by(News.created_at.desc()).all()
+    latest_news = latest_news_query().limit(HOME_NEWS_LIMIT).all()
     squad = Player.query.all()
-    matches = Match.query.order_by(Match.date.asc()).limit(5).all()
-    products = Product.query.all()
-    sponsors = Sponsor.query.all()
+    matches = home_matches()
+    products = featured_products()
+    sponsors = cached_sponsors.get()
 
     return render_template(
         "home.html",
         title="Início",
-        noticias=all_news,
+        noticias=latest_news,
         players=squad,
         matches=matches,
         products=products,
@@ -83,6 +459,7 @@ def home():
 
 
 @app.route("/time")
+@read_replica
 def time():
     from models import Player
     players = Player.query.all()
@@ -95,21 +472,29 @@ def time():
 
 
 @app.route("/loja")
+@read_replica
 def loja():
-    from models import Product
-    products = Product.query.all()
+    filters = shop_filters()
+    products, has_next = paginate_products(filters)
+    # Links de página mantêm os filtros atuais
+    page_args = {key: value for key, value in filters.items() if value is not None and key != "pagina"}
     return render_template(
         "loja.html", 
         title="Loja Oficial", 
         products=products,
+        filters=filters,
+        tags=product_tags(),
+        sorts=SHOP_SORTS,
+        page_args=page_args,
+        has_next=has_next,
         active_page="loja"
     )
 
 
 @app.route("/parceiros")
+@read_replica
 def parceiros():
-    from models import Sponsor
-    sponsors = Sponsor.query.all()
+    sponsors = cached_sponsors.get()
     return render_template(
         "parceiros.html", 
         title="Parceiros", 
@@ -119,25 +504,123 @@ def parceiros():
 
 
 @app.route("/noticias")
+@read_replica
+@cached_page("News")
 def noticias():
-    from models import News
-    all_news = News.query.order_by(News.created_at.desc()).all()
+    news_page, next_cursor = paginate_news(request.args.get("cursor"))
     return render_template(
-        "noticias.html", 
-        title="Notícias", 
-        noticias=all_news,
+        "noticias.html",
+        title="Notícias",
+        noticias=news_page,
+        next_cursor=next_cursor,
         active_page="noticias"
     )
 
 
+@app.route("/api/noticias")
+@read_replica
+def api_noticias():
+    """
+    Retorna uma página de notícias em JSON para o scroll infinito.
+    Use o 'next_cursor' da resposta como ?cursor= da próxima chamada.
+    """
+    try:
+        limit = min(int(request.args.get("limit", NEWS_PAGE_SIZE)), NEWS_PAGE_SIZE_MAX)
+    except ValueError:
+        limit = NEWS_PAGE_SIZE
+    news_page, next_cursor = paginate_news(request.args.get("cursor"), max(limit, 1))
+
+    items = []
+    for news_item in news_page:
+        image_url = url_for('static', filename=f'uploads/news/{news_item.image_file}') if news_item.image_file else 'https://via.placeholder.com/600x300'
+        items.append({
+            'id': news_item.id,
+            'title': news_item.title,
+            'summary': news_item.description[:100],
+            'description': news_item.description,
+            'image_url': image_url,
+            'link': news_item.link,
+            'created_at': news_item.created_at.isoformat() if news_item.created_at else None
+        })
+
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+# ============================================
+# BUSCA (NOTÍCIAS, PRODUTOS E JOGADORES)
+# ============================================
+SEARCH_KINDS = {"news": "Notícia", "product": "Produto", "player": "Jogador"}
+
+def search_result_url(result):
+    """Página pública onde o resultado aparece."""
+    if result["kind"] == "product":
+        return url_for("loja")
+    if result["kind"] == "player":
+        return url_for("time")
+    return url_for("noticias")
+
+def run_search():
+    """Lê q, tipo e limit da query string e executa a busca."""
+    query = request.args.get("q", "").strip()
+    kinds = [kind for kind in request.args.getlist("tipo") if kind in SEARCH_KINDS]
+    try:
+        limit = min(int(request.args.get("limit", search.SEARCH_LIMIT)), search.SEARCH_LIMIT_MAX)
+    except ValueError:
+        limit = search.SEARCH_LIMIT
+    results = search.search(db.session, query, kinds=kinds, limit=max(limit, 1))
+    for result in results:
+        result["url"] = search_result_url(result)
+        result["label"] = SEARCH_KINDS[result["kind"]]
+    return query, results
+
+
+@app.route("/buscar")
+@read_replica
+def buscar():
+    query, results = run_search()
+    for result in results:
+        result["snippet"] = search.highlight(result["snippet"])
+    return render_template(
+        "buscar.html",
+        title="Buscar",
+        query=query,
+        results=results,
+        active_page="buscar"
+    )
+
+
+@app.route("/api/buscar")
+@read_replica
+def api_buscar():
+    """Resultados da busca em JSON (snippet com os termos entre <mark>)."""
+    query, results = run_search()
+    items = [{
+        'kind': result['kind'],
+        'id': result['id'],
+        'title': result['title'],
+        'snippet': str(search.highlight(result['snippet'])),
+        'url': result['url'],
+        'score': result['score']
+    } for result in results]
+    return jsonify({'query': query, 'items': items})
+
+
 @app.route("/agenda")
+@read_replica
 def agenda():
-    from models import Match
-    matches = Match.query.order_by(Match.date.asc()).all()
+    # Sem cursor as duas listas vêm do cache (nenhuma consulta)
+    upcoming_cursor = request.args.get("proximas")
+    past_cursor = request.args.get("anteriores")
+    schedule = match_schedule.get()
+    upcoming, upcoming_next = paginate_matches(True, upcoming_cursor) if upcoming_cursor else schedule.upcoming
+    past, past_next = paginate_matches(False, past_cursor) if past_cursor else schedule.past
     return render_template(
         "agenda.html", 
         title="Agenda de Jogos", 
-        matches=matches,
+        matches=upcoming,
+        next_cursor=upcoming_next,
+        past_matches=past,
+        past_next_cursor=past_next,
         active_page="agenda"
     )
 
@@ -146,9 +629,32 @@ def agenda():
 # Flask-Login - load_user
 # ==========================================
 
+# O usuário de cada requisição vem de um cache por processo em vez de um
+# SELECT em user: guarda só os campos usados nas rotas/templates. Qualquer
+# commit em User (cadastro, rehash de senha, admin) troca a versão do modelo
+# e descarta o cache em todos os workers; alterações feitas fora do ORM
+# valem em no máximo USER_CACHE_TTL segundos (inclusive is_admin, usado
+# pelo admin_required).
+class SessionUser(namedtuple("SessionUser", ["id", "username", "email", "is_admin"]), UserMixin):
+    """Cópia leve (e imutável) do User logado, sem vínculo com a sessão do banco."""
+
+
+def _fetch_session_user(user_id):
+    row = db.session.execute(
+        db.select(User.id, User.username, User.email, User.is_admin).where(User.id == user_id)
+    ).first()
+    return SessionUser(row.id, row.username, row.email, bool(row.is_admin)) if row else None
+
+
+session_users = CachedMapping(_fetch_session_user, ("User",), ttl=app.config["USER_CACHE_TTL"])
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    try:
+        return session_users.get(int(user_id))
+    except ValueError:
+        return None
 
 
 # ==========================================
@@ -166,8 +672,8 @@ def cadastro():
             flash("E-mail já cadastrado!", "error")
             return redirect(url_for("cadastro"))
 
-        # Cria novo usuário com hash de senha
-        hashed_password = generate_password_hash(password)
+        # Cria novo usuário com hash de senha (política de security.py)
+        hashed_password = security.hash_password(password)
         user = User(username=username, email=email, password_hash=hashed_password)
 
         db.session.add(user)
@@ -178,15 +684,32 @@ def cadastro():
     return render_template("cadastro.html", title="Cadastro", active_page="cadastro")
 
 
+login_limiter = security.LoginRateLimiter(
+    app.config["LOGIN_RATE_LIMIT_IP"], app.config["LOGIN_RATE_LIMIT_EMAIL"]
+)
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         email = request.form["email"]
         password = request.form["password"]
 
+        # Recusa antes de consultar o banco e de calcular o hash (a parte cara)
+        if not login_limiter.allow(request.remote_addr, email):
+            flash("Muitas tentativas de login. Aguarde um pouco e tente de novo.", "error")
+            response = app.make_response((render_template("login.html", title="Login", active_page="login"), 429))
+            response.headers["Retry-After"] = str(login_limiter.retry_after(request.remote_addr, email))
+            return response
+
         user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password_hash, password):
+        if security.verify_password(user, password):
+            login_limiter.succeeded(request.remote_addr, email)
+            if db.session.is_modified(user):
+                db.session.commit()  # hash refeito com a política atual
             login_user(user)
+            session_cart.merge_on_login(user.id)
+            if app.config["CART_STORAGE"] != "session":
+                session_cart.clear()
             flash(f"Bem-vindo, {user.username}!", "success")
             return redirect(url_for("home"))
         else:
@@ -198,6 +721,8 @@ def login():
 
 @app.route("/logout")
 def logout():
+    sync_session_cart(force=True)
+    session_cart.clear()
     logout_user()
     flash("Você saiu da conta.", "success")
     return redirect(url_for("home"))
@@ -205,10 +730,25 @@ def logout():
 # ==========================================
 # ROTAS PROTEGIDAS EXEMPLO
 # ==========================================
+ORDER_HISTORY_PAGE_SIZE = 10
+
 @app.route("/perfil")
 @login_required
 def perfil():
-    return f"Olá, {current_user.username}! Esta é uma página protegida."
+    """Histórico de pedidos do usuário, do mais recente (usa ix_order_user_created_id)."""
+    query = (
+        Order.query.filter_by(user_id=current_user.id)
+        .options(selectinload(Order.lines))  # itens de todos os pedidos da página em 1 SELECT
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
+    orders, next_cursor = paginate_by_cursor(query, Order, request.args.get("cursor"), ORDER_HISTORY_PAGE_SIZE)
+    return render_template(
+        "perfil.html",
+        title="Meu Perfil",
+        orders=orders,
+        next_cursor=next_cursor,
+        first_page=not request.args.get("cursor")
+    )
 
 
 @app.context_processor
@@ -230,20 +770,71 @@ def admin_required(f):
 @app.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
-    players_count = Player.query.count()
-    matches_count = Match.query.count()
-    products_count = Product.query.count()
-    news_count = News.query.count()
-    sponsors_count = Sponsor.query.count()
+    counts = stats.dashboard_counts()
+    orders_total, revenue_total = stats.sales_totals()
     return render_template(
         'admin/dashboard.html',
-        players_count=players_count,
-        matches_count=matches_count,
-        products_count=products_count,
-        news_count=news_count,
-        sponsors_count=sponsors_count
+        players_count=counts['players'],
+        matches_count=counts['matches'],
+        products_count=counts['products'],
+        news_count=counts['news'],
+        sponsors_count=counts['sponsors'],
+        orders_total=orders_total,
+        revenue_total=revenue_total,
+        daily_sales=stats.daily_sales(),
+        sales_days=stats.SALES_DAYS
     )
 
+def analytics_period():
+    """Lê ?inicio=&fim= (AAAA-MM-DD); o padrão são os últimos SALES_DAYS dias."""
+    today = stats.utc_today()
+    try:
+        end = datetime.date.fromisoformat(request.args["fim"]) if request.args.get("fim") else today
+        start = (datetime.date.fromisoformat(request.args["inicio"]) if request.args.get("inicio")
+                 else end - datetime.timedelta(days=stats.SALES_DAYS - 1))
+    except ValueError:
+        abort(400)
+    return start, end
+
+@app.route('/admin/analytics/vendas')
+@admin_required
+def admin_analytics_sales():
+    """Pedidos e faturamento por dia no período (tabela daily_sales)."""
+    start, end = analytics_period()
+    days = [
+        {'day': str(day), 'orders': orders, 'revenue': round(revenue or 0, 2)}
+        for day, orders, revenue in stats.revenue_by_day(start, end)
+    ]
+    return jsonify({'start': start.isoformat(), 'end': end.isoformat(), 'days': days})
+
+@app.route('/admin/analytics/produtos')
+@admin_required
+def admin_analytics_products():
+    """Produtos mais vendidos no período (tabela daily_product_sales)."""
+    start, end = analytics_period()
+    try:
+        limit = min(max(int(request.args.get('limit', stats.TOP_PRODUCTS_LIMIT)), 1), 100)
+    except ValueError:
+        limit = stats.TOP_PRODUCTS_LIMIT
+    products = [
+        {'product_id': product_id, 'name': name, 'units': units, 'revenue': round(revenue or 0, 2)}
+        for product_id, name, units, revenue in stats.product_sales(start, end, limit)
+    ]
+    return jsonify({'start': start.isoformat(), 'end': end.isoformat(), 'products': products})
+
+@app.cli.command("gerar-linhas-pedidos")
+def backfill_order_lines_command():
+    """Cria as OrderLine dos pedidos feitos antes da tabela existir."""
+    created = checkout_service.backfill_order_lines()
+    print(f"{created} linhas de pedido criadas")
+
+@app.cli.command("recalcular-estatisticas")
+def rebuild_stats_command():
+    """Recalcula os contadores do dashboard a partir das tabelas."""
+    with db.engine.begin() as connection:
+        stats.rebuild_stats(connection)
+    print("Estatísticas recalculadas")
+
 
 # ==========================================
 # UPLOAD DE IMAGENS
@@ -253,26 +844,267 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Colunas que referenciam os arquivos de cada subpasta de uploads
+UPLOAD_REFERENCES = {
+    'players': [Player.image_file],
+    'products': [Product.image_file],
+    'news': [News.image_file],
+    'sponsors': [Sponsor.logo_file],
+}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Um arquivo gravado/reaproveitado há menos que isso não é apagado: o
+# registro que vai usá-lo pode ainda não ter sido commitado
+UPLOAD_GRACE_SECONDS = 60
+
+def refresh_pages_using(subdirectory):
+    """
+    Invalida as páginas em cache dos modelos que usam a pasta: o srcset do
+    responsive_image depende de versões geradas depois do commit.
+    """
+    bump_version(*{column.class_.__name__ for column in UPLOAD_REFERENCES.get(subdirectory, [])})
+
 def save_picture(form_picture, subdirectory):
-    """Salva a imagem no sistema de arquivos com um nome único."""
-    random_hex = secrets.token_hex(8)
+    """
+    Salva a imagem com o nome igual ao hash (SHA-256) do conteúdo.
+    O arquivo é lido em blocos enquanto é gravado e o hash é calculado,
+    sem carregar tudo na memória; se o mesmo conteúdo já existir, reaproveita.
+    """
     _, f_ext = os.path.splitext(form_picture.filename)
-    picture_fn = random_hex + f_ext
-    full_upload_folder = os.path.join(UPLOAD_ROOT, subdirectory)
+    full_upload_folder = os.path.join(current_app.root_path, UPLOAD_ROOT, subdirectory)
+    os.makedirs(full_upload_folder, exist_ok=True)
 
-    os.makedirs(os.path.join(current_app.root_path, full_upload_folder), exist_ok=True)
-    picture_path = os.path.join(current_app.root_path, full_upload_folder, picture_fn)
-    form_picture.save(picture_path)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=full_upload_folder, suffix='.upload', delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: form_picture.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+    picture_fn = digest.hexdigest()[:32] + f_ext.lower()
+    picture_path = os.path.join(full_upload_folder, picture_fn)
+    try:
+        while True:
+            try:
+                os.link(tmp.name, picture_path)  # atômico: falha se o arquivo já existe
+            except FileExistsError:
+                try:
+                    # Conteúdo repetido: usa o arquivo que já existe e renova o
+                    # mtime para o delete_picture não apagá-lo agora
+                    os.utime(picture_path)
+                    break
+                except FileNotFoundError:
+                    continue  # apagado entre o link e o utime: tenta criar de novo
+            else:
+                # thumb/card/hero + WebP em segundo plano; prontas, o HTML em cache é refeito
+                future = images.schedule_renditions(picture_path)
+                if future:
+                    future.add_done_callback(lambda _: refresh_pages_using(subdirectory))
+                break
+    finally:
+        os.unlink(tmp.name)
 
     return picture_fn 
 
+def picture_references(filename, subdirectory):
+    """Quantos registros ainda apontam para o arquivo."""
+    return sum(
+        db.session.query(func.count()).filter(column == filename).scalar()
+        for column in UPLOAD_REFERENCES.get(subdirectory, [])
+    )
+
 def delete_picture(filename, subdirectory):
-    """Deleta o arquivo de imagem do sistema de arquivos."""
-    if filename:
-        full_upload_folder = os.path.join(UPLOAD_ROOT, subdirectory)
-        picture_path = os.path.join(current_app.root_path, full_upload_folder, filename)
-        if os.path.exists(picture_path):
-            os.remove(picture_path)
+    """
+    Deleta o arquivo de imagem do sistema de arquivos se nenhum registro
+    usar mais o arquivo. Chamar depois do commit que removeu a referência.
+
+    Um upload do mesmo conteúdo pode estar em andamento (arquivo já salvo,
+    registro ainda não commitado): o arquivo sai do lugar com um rename
+    atômico e, se foi gravado ou reaproveitado há pouco, volta.
+    """
+    if not filename or picture_references(filename, subdirectory) != 0:
+        return
+    full_upload_folder = os.path.join(UPLOAD_ROOT, subdirectory)
+    picture_path = os.path.join(current_app.root_path, full_upload_folder, filename)
+    trash_path = f"{picture_path}.{secrets.token_hex(8)}.deleting"
+    try:
+        os.rename(picture_path, trash_path)
+    except FileNotFoundError:
+        return
+    try:
+        if datetime.datetime.now().timestamp() - os.stat(trash_path).st_mtime < UPLOAD_GRACE_SECONDS:
+            try:
+                os.link(trash_path, picture_path)
+            except FileExistsError:
+                pass  # um upload já recriou o arquivo
+            return
+        images.delete_renditions(picture_path)
+    finally:
+        os.unlink(trash_path)
+
+def cleanup_pictures(filenames, subdirectory):
+    """Roda fora do request (pool de images): precisa do próprio app context."""
+    with app.app_context():
+        for filename in filenames:
+            delete_picture(filename, subdirectory)
+
+def schedule_picture_cleanup(filenames, subdirectory):
+    """Agenda a remoção dos arquivos que ficaram sem referência."""
+    if filenames:
+        images.run_in_background(cleanup_pictures, list(filenames), subdirectory)
+
+@app.after_request
+def cache_uploads_forever(response):
+    """Uploads nunca mudam de conteúdo (o nome é o hash), então o cache é eterno."""
+    if request.path.startswith('/static/uploads/') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métricas de todos os workers no formato de texto do Prometheus."""
+    token = app.config["METRICS_TOKEN"]
+    if not token:
+        if not app.debug:
+            abort(403)  # sem METRICS_TOKEN o endpoint só responde em modo debug
+    elif not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    return current_app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """CSS/JS de static/dist (nome com hash), pré-comprimido e com cache eterno."""
+    return assets.send_asset(filename)
+
+@app.cli.command("construir-assets")
+@click.option("--no-fetch", is_flag=True, help="Não baixa as bibliotecas que faltam em static/vendor.")
+def build_assets_command(no_fetch):
+    """Compila o Tailwind, junta o JS e gera os arquivos com hash em static/dist."""
+    manifest = assets.build(fetch=not no_fetch)
+    for name, filename in manifest.items():
+        print(f"{name} -> {filename}")
+
+@app.cli.command("gerar-imagens")
+def generate_images_command():
+    """Gera as versões redimensionadas de todos os uploads existentes."""
+    upload_dir = os.path.join(app.root_path, UPLOAD_ROOT)
+    for root, _, files in os.walk(upload_dir):
+        for filename in files:
+            # Ignora as próprias versões (nome-thumb.webp, ...)
+            if any(filename.rsplit('.', 1)[0].endswith(f"-{name}") for name in images.RENDITIONS):
+                continue
+            created = images.generate_renditions(os.path.join(root, filename))
+            print(f"{filename}: {len(created)} versões")
+    for subdirectory in UPLOAD_REFERENCES:
+        refresh_pages_using(subdirectory)
+
+
+# ==========================================
+# IMPORTAÇÃO / EXPORTAÇÃO EM MASSA
+# ==========================================
+BULK_IMPORT_REPORTED_ERRORS = 5
+
+@app.route('/admin/<entity>/export.<fmt>')
+@admin_required
+def admin_export(entity, fmt):
+    """Baixa todos os registros da entidade em CSV ou JSONL (streaming)."""
+    if entity not in bulk_io.ENTITIES or fmt not in bulk_io.FORMATS:
+        abort(404)
+    return Response(
+        stream_with_context(bulk_io.export_records(entity, fmt)),
+        mimetype=bulk_io.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={entity}.{fmt}'}
+    )
+
+@app.route('/admin/<entity>/import', methods=['POST'])
+@admin_required
+def admin_import(entity):
+    """Importa um arquivo CSV/JSONL enviado pelo admin."""
+    if entity not in bulk_io.ENTITIES:
+        abort(404)
+    file = request.files.get('file')
+    fmt = bulk_io.detect_format(file.filename) if file else None
+    if not fmt:
+        flash('Erro: envie um arquivo .csv ou .jsonl.', 'danger')
+        return redirect(url_for(f'admin_{entity}'))
+
+    result = bulk_io.import_records(entity, file.stream, fmt)
+    flash(f'{result.inserted} registros importados, {result.failed} linhas com erro.',
+          'success' if not result.failed else 'warning')
+    if result.stopped_at:
+        flash(f'Importação interrompida na linha {result.stopped_at}: só as linhas anteriores foram lidas.', 'danger')
+    for line, message in result.errors[:BULK_IMPORT_REPORTED_ERRORS]:
+        flash(f'Linha {line}: {message}', 'danger')
+    return redirect(url_for(f'admin_{entity}'))
+
+@app.route('/admin/<entity>/bulk-delete', methods=['POST'])
+@admin_required
+def admin_bulk_delete(entity):
+    """Deleta os registros marcados com um único DELETE ... WHERE id IN (...)."""
+    if entity not in bulk_io.ENTITIES:
+        abort(404)
+    try:
+        ids = bulk_io.parse_ids(request.form.getlist('ids'))
+    except ValueError as error:
+        flash(f'Erro: {error}.', 'danger')
+        return redirect(url_for(f'admin_{entity}'))
+    if not ids:
+        flash('Nenhum registro selecionado.', 'warning')
+        return redirect(url_for(f'admin_{entity}'))
+
+    deleted, files = bulk_io.bulk_delete(entity, ids)
+    schedule_picture_cleanup(files, entity)
+    flash(f'{deleted} registros deletados.', 'success')
+    return redirect(url_for(f'admin_{entity}'))
+
+@app.route('/admin/<entity>/bulk-edit', methods=['POST'])
+@admin_required
+def admin_bulk_edit(entity):
+    """Altera os campos preenchidos em todos os registros marcados (um UPDATE)."""
+    if entity not in bulk_io.BULK_EDIT_FIELDS:
+        abort(404)
+    try:
+        ids = bulk_io.parse_ids(request.form.getlist('ids'))
+        if not ids:
+            flash('Nenhum registro selecionado.', 'warning')
+            return redirect(url_for(f'admin_{entity}'))
+        updated = bulk_io.bulk_update(entity, ids, request.form)
+    except ValueError as error:
+        flash(f'Erro: {error}.', 'danger')
+        return redirect(url_for(f'admin_{entity}'))
+
+    flash(f'{updated} registros atualizados.', 'success')
+    return redirect(url_for(f'admin_{entity}'))
+
+@app.cli.command("importar")
+@click.argument("entity", type=click.Choice(list(bulk_io.ENTITIES)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", default=bulk_io.CHUNK_SIZE, show_default=True, help="Linhas por transação.")
+def import_command(entity, path, chunk_size):
+    """Importa um arquivo CSV/JSONL (ex.: flask importar matches agenda.csv)."""
+    fmt = bulk_io.detect_format(path)
+    if not fmt:
+        raise click.BadParameter("use um arquivo .csv ou .jsonl", param_hint="PATH")
+    with open(path, "rb") as stream:
+        result = bulk_io.import_records(entity, stream, fmt, chunk_size=chunk_size)
+    print(f"{result.inserted} registros importados, {result.failed} linhas com erro")
+    for line, message in result.errors:
+        print(f"  linha {line}: {message}")
+
+@app.cli.command("exportar")
+@click.argument("entity", type=click.Choice(list(bulk_io.ENTITIES)))
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+def export_command(entity, path):
+    """Exporta a entidade para CSV/JSONL (ex.: flask exportar news noticias.jsonl)."""
+    fmt = bulk_io.detect_format(path)
+    if not fmt:
+        raise click.BadParameter("use um arquivo .csv ou .jsonl", param_hint="PATH")
+    with open(path, "w", encoding="utf-8", newline="") as output:
+        for chunk in bulk_io.export_records(entity, fmt):
+            output.write(chunk)
 
 
 # ==========================================
@@ -345,15 +1177,17 @@ def admin_edit_player(player_id):
         player.twitch = request.form.get('twitch')
         file = request.files.get('file')
         
+        old_picture = None
         if file and file.filename != '':
             if allowed_file(file.filename):
-                delete_picture(player.image_file, 'players')
+                old_picture = player.image_file
                 new_filename = save_picture(file, 'players')
                 player.image_file = new_filename
             else:
                 flash('Erro: Extensão de arquivo não permitida! Imagem anterior mantida.', 'warning')
         
         db.session.commit()
+        delete_picture(old_picture, 'players')
         flash("Player atualizado com sucesso!", "success")
         return redirect(url_for('admin_players'))
 
@@ -364,9 +1198,10 @@ def admin_edit_player(player_id):
 @admin_required
 def admin_delete_player(player_id):
     player = Player.query.get_or_404(player_id)
-    delete_picture(player.image_file, 'players')
+    picture = player.image_file
     db.session.delete(player)
     db.session.commit()
+    delete_picture(picture, 'players')
     flash(f"Player '{player.name}' deletado com sucesso!", "success")
     return redirect(url_for('admin_players'))
 
@@ -418,15 +1253,17 @@ def admin_edit_product(product_id):
         product.tag = request.form.get('tag')
         file = request.files.get('file')
         
+        old_picture = None
         if file and file.filename != '':
             if allowed_file(file.filename):
-                delete_picture(product.image_file, 'products')
+                old_picture = product.image_file
                 new_filename = save_picture(file, 'products')
                 product.image_file = new_filename
             else:
                 flash('Erro: Extensão de arquivo não permitida! Imagem anterior mantida.', 'warning')
 
         db.session.commit()
+        delete_picture(old_picture, 'products')
         flash('Produto atualizado com sucesso!', 'success')
         return redirect(url_for('admin_products'))
     return render_template('admin/products_edit.html', product=product)
@@ -436,9 +1273,10 @@ def admin_edit_product(product_id):
 @admin_required
 def admin_delete_product(product_id):
     product = Product.query.get_or_404(product_id)
-    delete_picture(product.image_file, 'products')
+    picture = product.image_file
     db.session.delete(product)
     db.session.commit()
+    delete_picture(picture, 'products')
     flash('Produto deletado com sucesso!', 'success')
     return redirect(url_for('admin_products'))
 
@@ -487,15 +1325,16 @@ def admin_edit_news(news_id):
         news.description = request.form['description']
         news.link = request.form.get('link')
         file = request.files.get('file')
+        old_picture = None
         if file and file.filename != '':
             if allowed_file(file.filename):
-                if news.image_file:
-                    delete_picture(news.image_file, 'news')
+                old_picture = news.image_file
                 new_filename = save_picture(file, 'news') 
                 news.image_file = new_filename
             else:
                 flash('Erro: Extensão de arquivo não permitida! Mantendo imagem anterior.', 'warning')
         db.session.commit()
+        delete_picture(old_picture, 'news')
         flash('Notícia atualizada com sucesso!', 'success')
         return redirect(url_for('admin_news'))
     return render_template('admin/news_edit.html', news=news)
@@ -505,9 +1344,10 @@ def admin_edit_news(news_id):
 @admin_required
 def admin_delete_news(news_id):
     news = News.query.get_or_404(news_id)
-    delete_picture(news.image_file, 'news')
+    picture = news.image_file
     db.session.delete(news)
     db.session.commit()
+    delete_picture(picture, 'news')
     flash('Notícia deletada com sucesso!', 'success')
     return redirect(url_for('admin_news'))
 
@@ -618,6 +1458,7 @@ def admin_add_sponsor():
         sponsor = Sponsor(name=name, logo_file=filename, website=website)
         db.session.add(sponsor)
         db.session.commit()
+        cached_sponsors.invalidate()
         flash('Parceiro adicionado com sucesso!', 'success')
         return redirect(url_for('admin_sponsors'))
     return render_template('admin/sponsors_add.html')
@@ -632,15 +1473,18 @@ def admin_edit_sponsor(sponsor_id):
         sponsor.website = request.form.get('website')
         file = request.files.get('file')
         
+        old_picture = None
         if file and file.filename != '':
             if allowed_file(file.filename):
-                delete_picture(sponsor.logo_file, 'sponsors')
+                old_picture = sponsor.logo_file
                 new_filename = save_picture(file, 'sponsors')
                 sponsor.logo_file = new_filename
             else:
                 flash('Erro: Extensão de arquivo não permitida! Logo anterior mantido.', 'warning')
         
         db.session.commit()
+        cached_sponsors.invalidate()
+        delete_picture(old_picture, 'sponsors')
         flash('Parceiro atualizado com sucesso!', 'success')
         return redirect(url_for('admin_sponsors'))
     return render_template('admin/sponsors_edit.html', sponsor=sponsor)
@@ -650,9 +1494,11 @@ def admin_edit_sponsor(sponsor_id):
 @admin_required
 def admin_delete_sponsor(sponsor_id):
     sponsor = Sponsor.query.get_or_404(sponsor_id)
-    delete_picture(sponsor.logo_file, 'sponsors')
+    picture = sponsor.logo_file
     db.session.delete(sponsor)
     db.session.commit()
+    cached_sponsors.invalidate()
+    delete_picture(picture, 'sponsors')
     flash('Parceiro deletado com sucesso!', 'success')
     return redirect(url_for('admin_sponsors'))
 
@@ -669,39 +1515,89 @@ def calculate_cart_total(cart):
                 total += float(item.product.price) * item.quantity
     return total
 
+def load_cart(user_id):
+    """Carrega o carrinho já com itens e produtos (um único SELECT com JOIN)."""
+    return (
+        Cart.query
+        .options(joinedload(Cart.items).joinedload(CartItem.product))
+        .filter_by(user_id=user_id)
+        .first()
+    )
+
+def cart_rows(user_id):
+    """
+    Retorna os itens do carrinho com os dados do produto e o total do carrinho
+    (calculado no SQL com SUM() OVER ()) em uma única consulta.
+    """
+    return (
+        db.session.query(
+            CartItem.product_id,
+            CartItem.quantity,
+            Product.name,
+            Product.price,
+            Product.image_file,
+            func.sum(Product.price * CartItem.quantity).over().label("total")
+        )
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .join(Product, Product.id == CartItem.product_id)
+        .filter(Cart.user_id == user_id)
+        .order_by(CartItem.id)
+        .all()
+    )
+
+def cart_etag(user_id):
+    """
+    ETag do carrinho montado a partir das versões de Cart, CartItem e Product.
+    Calculado só com os.stat(), sem consultar o banco.
+    """
+    versions = [model_version(name) for name in ("Cart", "CartItem", "Product")]
+    raw = f"{user_id}:{versions}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
 
 # ==========================================
 # ROTAS DO CARRINHO
 # ==========================================
+def cart_in_session():
+    """Indica se o carrinho da requisição fica na sessão (anônimos sempre ficam)."""
+    return app.config["CART_STORAGE"] == "session" or not current_user.is_authenticated
+
+def sync_session_cart(force=False):
+    """Grava o carrinho da sessão no banco (com debounce, a menos que force=True)."""
+    if current_user.is_authenticated and app.config["CART_STORAGE"] == "session":
+        session_cart.flush(current_user.id, force=force)
+
+def cart_item_json(product_id, name, price, quantity, image_file):
+    image_url = url_for('static', filename=f'uploads/products/{image_file}') if image_file else 'https://placehold.co/64x64/1a1a2e/f0f0f0?text=PRODUTO'
+    return {
+        'id': product_id,
+        'name': name,
+        'price': float(price),
+        'quantity': quantity,
+        'image_url': image_url
+    }
+
 @app.route('/add-to-cart/<int:product_id>', methods=['POST'])
-@login_required
 def add_to_cart(product_id):
-    from models import Product, Cart, CartItem
-
     product = Product.query.get_or_404(product_id)
-    cart = Cart.query.filter_by(user_id=current_user.id).first()
-    if not cart:
-        cart = Cart(user_id=current_user.id)
-        db.session.add(cart)
-        db.session.commit()
-
-    cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product.id).first()
-    if cart_item:
-        cart_item.quantity += 1
+    product_name = product.name  # lido antes do commit expirar o objeto
+    if cart_in_session():
+        if not session_cart.add_item(product.id):
+            flash("Seu carrinho atingiu o limite de produtos diferentes.", "warning")
+            return redirect(url_for('loja'))
+        sync_session_cart()
     else:
-        cart_item = CartItem(cart_id=cart.id, product_id=product.id, quantity=1)
-        db.session.add(cart_item)
-
-    db.session.commit()
-    flash(f"{product.name} adicionado ao carrinho!", "success")
+        cart_service.add_item(current_user.id, product.id)
+    flash(f"{product_name} adicionado ao carrinho!", "success")
     return redirect(url_for('loja'))
 
 @app.route('/carrinho')
-@login_required
 def carrinho():
-    from models import Cart
-    cart = Cart.query.filter_by(user_id=current_user.id).first()
-    
+    if cart_in_session():
+        cart = session_cart.load_cart()
+    else:
+        cart = load_cart(current_user.id)
+
     if not cart:
         cart = Cart(user_id=current_user.id)
         db.session.add(cart)
@@ -710,150 +1606,153 @@ def carrinho():
     return render_template('carrinho.html', cart=cart)
 
 @app.route('/update-cart-quantity/<int:product_id>', methods=['POST'])
-@login_required
 def update_cart_quantity(product_id):
     try:
         new_quantity = int(request.form.get('quantity', 1))
-        print(f"Atualizando quantity para produto {product_id}: {new_quantity}")  # Log
     except ValueError:
         flash("Quantidade inválida fornecida.", "danger")
         return redirect(url_for('carrinho'))
 
-    cart = Cart.query.filter_by(user_id=current_user.id).first()
-    if cart:
-        cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
-        if cart_item:
-            if new_quantity <= 0:
-                db.session.delete(cart_item)
-                flash(f"{cart_item.product.name} removido do carrinho.", "warning")
-            else:
-                cart_item.quantity = new_quantity
-                flash(f"Quantidade de {cart_item.product.name} atualizada para {new_quantity}.", "info")
-            db.session.commit()
-            print(f"Quantity atualizada com sucesso para {new_quantity}")  # Log
+    if cart_in_session():
+        updated = session_cart.set_quantity(product_id, new_quantity)
+        sync_session_cart()
+    else:
+        updated = cart_service.set_quantity(current_user.id, product_id, new_quantity)
+
+    if updated:
+        product = db.session.get(Product, product_id)
+        product_name = product.name if product else "Produto"
+        if new_quantity <= 0:
+            flash(f"{product_name} removido do carrinho.", "warning")
+        else:
+            flash(f"Quantidade de {product_name} atualizada para {new_quantity}.", "info")
+        app.logger.info(
+            "Quantidade atualizada", extra={"product_id": product_id, "quantity": new_quantity}
+        )
     return redirect(url_for('carrinho'))
 
 @app.route('/remove-from-cart/<int:product_id>', methods=['POST'])
-@login_required
 def remove_from_cart(product_id):
     """Remove um item específico do carrinho."""
-    from models import Cart, CartItem
-    
-    cart = Cart.query.filter_by(user_id=current_user.id).first()
-    
-    if cart:
-        cart_item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
-        if cart_item:
-            db.session.delete(cart_item)
-            db.session.commit()
-            flash("Item removido do carrinho.", "warning")
-            
+    if cart_in_session():
+        removed = session_cart.remove_item(product_id)
+        sync_session_cart()
+    else:
+        removed = cart_service.remove_item(current_user.id, product_id)
+
+    if removed:
+        flash("Item removido do carrinho.", "warning")
+
     return redirect(url_for('carrinho'))
 
 @app.route('/api/cart')
-@login_required
 def api_cart():
     """
     Retorna os itens do carrinho do usuário logado em formato JSON, 
     incluindo o total recalculado.
+    Responde 304 sem consultar o banco se o If-None-Match ainda for válido.
     """
-    from models import Cart
-    
-    cart = Cart.query.filter_by(user_id=current_user.id).first()
-    total = calculate_cart_total(cart)
-
-    if not cart or not cart.items:
-        return jsonify({'items': [], 'total': 0.0})
-    
-    cart_data = []
-
-    for item in cart.items:
-        if item.product:
-            image_url = url_for('static', filename=f'uploads/products/{item.product.image_file}') if item.product.image_file else 'https://placehold.co/64x64/1a1a2e/f0f0f0?text=PRODUTO'
-            
-            cart_data.append({
-                'id': item.product_id,
-                'name': item.product.name,
-                'price': float(item.product.price),
-                'quantity': item.quantity,
-                'image_url': image_url
-            })
-            
-    return jsonify({
-        'items': cart_data,
-        'total': total
-    })
+    etag = session_cart.etag() if cart_in_session() else cart_etag(current_user.id)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    elif cart_in_session():
+        cart = session_cart.load_cart()
+        response = jsonify({
+            'items': [
+                cart_item_json(item.product_id, item.product.name, item.product.price, item.quantity, item.product.image_file)
+                for item in cart.items
+            ],
+            'total': calculate_cart_total(cart)
+        })
+    else:
+        rows = cart_rows(current_user.id)
+        response = jsonify({
+            'items': [
+                cart_item_json(row.product_id, row.name, row.price, row.quantity, row.image_file)
+                for row in rows
+            ],
+            'total': float(rows[0].total) if rows else 0.0
+        })
+
+    # O navegador revalida sempre, mas reaproveita o corpo com 304
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/checkout', methods=['GET', 'POST'])
 @login_required
 def checkout():
-    cart = Cart.query.filter_by(user_id=current_user.id).first()
-    if not cart or not cart.items:
-        flash("Seu carrinho está vazio.", "warning")
-        return redirect(url_for('carrinho'))
-    
-    # Calcule e atribua total_price ao cart (para o template acessar)
-    cart.total_price = calculate_cart_total(cart)
-    
+    sync_session_cart(force=True)  # o pedido é montado a partir do banco
+
     if request.method == 'POST':
+        # Re-envio do mesmo formulário (duplo clique, retry): mostra o pedido já criado
+        idempotency_key = request.form.get('idempotency_key', '')[:64]
+        existing_order = checkout_service.find_order(current_user.id, idempotency_key)
+        if existing_order:
+            return redirect_to_confirmation(existing_order)
+
         # Colete dados do formulário
-        name = request.form.get('name')
-        email = request.form.get('email')
-        address = request.form.get('address')
-        city = request.form.get('city')
-        zip_code = request.form.get('zip_code')
-        payment_method = request.form.get('payment_method')
+        details = {
+            'name': request.form.get('name'),
+            'email': request.form.get('email'),
+            'address': request.form.get('address'),
+            'city': request.form.get('city'),
+            'zip_code': request.form.get('zip_code'),
+            'payment_method': request.form.get('payment_method'),
+        }
+        if not all(value and value.strip() for value in details.values()):
+            flash("Preencha todos os campos do pedido.", "error")
+            return redirect(url_for('checkout'))
         coupon = request.form.get('coupon', '').upper()
         
         # Aplique desconto simples (ex.: DESCONTO10 para 10% off)
-        discount = 0.0
-        total = cart.total_price  # Use o total calculado
+        discount_rate = 0.0
         if coupon == 'DESCONTO10':
-            discount = total * 0.1
-            total -= discount
-            flash(f"Cupom aplicado! Desconto de R$ {discount:.2f}.", "success")
+            discount_rate = 0.1
         elif coupon:
             flash("Cupom inválido.", "error")
             return redirect(url_for('checkout'))
         
         # Simule processamento de pagamento (sempre "sucesso" para teste)
-        if payment_method not in ['pix', 'credit_card', 'boleto']:
+        if details['payment_method'] not in ['pix', 'credit_card', 'boleto']:
             flash("Método de pagamento inválido.", "error")
             return redirect(url_for('checkout'))
         
-        # Salve o pedido (crie a tabela Order se necessário)
-        order = Order(
-            user_id=current_user.id,
-            name=name,
-            email=email,
-            address=address,
-            city=city,
-            zip_code=zip_code,
-            payment_method=payment_method,
-            total=total,
-            items=[{'name': item.product.name, 'quantity': item.quantity, 'price': item.product.price} for item in cart.items]  # Salve como JSON
+        # Salve o pedido e limpe o carrinho na mesma transação
+        order, created = checkout_service.place_order(
+            current_user.id, details, idempotency_key, discount_rate
         )
-        db.session.add(order)
-        db.session.commit()
-        
-        # Limpe o carrinho
-        for item in cart.items:
-            db.session.delete(item)
-        db.session.commit()
-        
-        # Salve detalhes na session para a página de confirmação
-        session['order_details'] = {
-            'order_id': order.id,
-            'total': total,
-            'items': order.items,
-            'email': email
-        }
-        
-        flash("Pedido processado com sucesso!", "success")
-        print(f"Pedido {order.id} processado para usuário {current_user.id}")  # Log
-        return redirect(url_for('confirmation'))
+        if order is None:
+            flash("Seu carrinho está vazio.", "warning")
+            return redirect(url_for('carrinho'))
+        session_cart.clear()
+
+        if created:
+            if discount_rate:
+                discount = order.total / (1 - discount_rate) * discount_rate
+                flash(f"Cupom aplicado! Desconto de R$ {discount:.2f}.", "success")
+            flash("Pedido processado com sucesso!", "success")
+            app.logger.info("Pedido processado", extra={"order_id": order.id})
+        return redirect_to_confirmation(order)
+
+    cart = load_cart(current_user.id)
+    if not cart or not cart.items:
+        flash("Seu carrinho está vazio.", "warning")
+        return redirect(url_for('carrinho'))
     
-    return render_template('checkout.html', cart=cart)
+    # Calcule e atribua total_price ao cart (para o template acessar)
+    cart.total_price = calculate_cart_total(cart)
+    return render_template('checkout.html', cart=cart, idempotency_key=secrets.token_urlsafe(24))
+
+def redirect_to_confirmation(order):
+    """Salva os detalhes do pedido na session para a página de confirmação."""
+    session['order_details'] = {
+        'order_id': order.id,
+        'total': order.total,
+        'items': order.items,
+        'email': order.email
+    }
+    return redirect(url_for('confirmation'))
 
 @app.route('/confirmation')
 @login_required
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+import tempfile
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só há as versões .gz
+    brotli = None
+
+# ============================================
+# PIPELINE DE ASSETS ESTÁTICOS
+# ============================================
+# 'flask construir-assets' gera em static/dist/:
+#   - app.css: Tailwind compilado (só as classes usadas em templates/,
+#     static/js/ e nos .py, com o tema de static/tailwind-config.js) + static/style.css
+#   - site.js / vanta.js: bibliotecas de static/vendor/ (baixadas uma vez,
+#     em versões fixas) concatenadas com o JS do site
+# Cada arquivo ganha o hash do conteúdo no nome (app.3f2a….css), versões .gz
+# e .br pré-comprimidas e uma entrada em manifest.json. A rota /assets/
+# serve a melhor versão para o Accept-Encoding com cache eterno (o nome
+# muda quando o conteúdo muda).
+#
+# O build roda no deploy (bin/post_compile, no slug do Heroku), nunca no
+# processo web: ele baixa arquivos e precisa do Tailwind CLI/Node. Sem
+# manifest (build não rodou ou falhou) os templates usam static/ e os CDNs.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+VENDOR_DIR = os.path.join(STATIC_DIR, "vendor")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+TAILWIND_VERSION = "3.4.17"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESSIBLE = (".css", ".js", ".svg", ".json")
+
+# Bibliotecas de terceiros: arquivo em static/vendor -> URL com versão fixa
+VENDOR = {
+    "feather.min.js": "https://cdn.jsdelivr.net/npm/feather-icons@4.29.2/dist/feather.min.js",
+    "alpine.min.js": "https://cdn.jsdelivr.net/npm/alpinejs@3.14.8/dist/cdn.min.js",
+    "three.min.js": "https://cdn.jsdelivr.net/npm/three@0.132.2/build/three.min.js",
+    "vanta.net.min.js": "https://cdn.jsdelivr.net/npm/vanta@0.5.24/dist/vanta.net.min.js",
+}
+
+# Bundles de JS (caminhos relativos a static/, na ordem de execução).
+# O Alpine vai por último: ele inicia depois que o bundle inteiro rodou.
+BUNDLES = {
+    "site.js": ["vendor/feather.min.js", "js/site.js", "vendor/alpine.min.js"],
+    "vanta.js": ["vendor/three.min.js", "vendor/vanta.net.min.js"],
+}
+
+TAILWIND_INPUT = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+# Os .py também: images.responsive_image gera HTML com classes do Tailwind
+TAILWIND_CONTENT = ["templates/**/*.html", "static/js/**/*.js", "*.py"]
+
+
+# ============================================
+# BUILD
+# ============================================
+
+def fetch_vendor(force=False):
+    """Baixa as bibliotecas que ainda não estão em static/vendor."""
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    fetched = []
+    for filename, url in VENDOR.items():
+        path = os.path.join(VENDOR_DIR, filename)
+        if os.path.exists(path) and not force:
+            continue
+        with urllib.request.urlopen(url, timeout=60) as response, open(path, "wb") as f:
+            shutil.copyfileobj(response, f)
+        fetched.append(filename)
+    return fetched
+
+
+def _tailwind_command():
+    """CLI standalone do Tailwind se estiver no PATH; senão via npx."""
+    command = os.environ.get("TAILWIND_BIN") or shutil.which("tailwindcss")
+    if command:
+        return [command]
+    return ["npx", "--yes", f"tailwindcss@{TAILWIND_VERSION}"]
+
+
+def build_css():
+    """Compila o Tailwind (purgado e minificado) e junta o style.css."""
+    with open(os.path.join(STATIC_DIR, "tailwind-config.js"), encoding="utf-8") as f:
+        theme = f.read()
+    with open(os.path.join(STATIC_DIR, "style.css"), encoding="utf-8") as f:
+        site_css = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # O mesmo tailwind-config.js do Play CDN vira o config do CLI
+        config_path = os.path.join(tmp, "tailwind.config.js")
+        with open(config_path, "w", encoding="utf-8") as f:
+            f.write("const tailwind = {};\n")
+            f.write(theme)
+            content = [os.path.join(BASE_DIR, pattern) for pattern in TAILWIND_CONTENT]
+            f.write(f"\nmodule.exports = Object.assign({{}}, tailwind.config, {{ content: {json.dumps(content)} }});\n")
+
+        input_path = os.path.join(tmp, "input.css")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write(TAILWIND_INPUT + site_css)
+
+        output_path = os.path.join(tmp, "app.css")
+        subprocess.run(
+            _tailwind_command() + ["-c", config_path, "-i", input_path, "-o", output_path, "--minify"],
+            cwd=BASE_DIR, check=True,
+        )
+        with open(output_path, "rb") as f:
+            return f.read()
+
+
+def build_js(parts):
+    chunks = []
+    for part in parts:
+        with open(os.path.join(STATIC_DIR, part), "rb") as f:
+            chunks.append(f.read().rstrip() + b"\n;\n")
+    return b"".join(chunks)
+
+
+def _write_compressed(path, content):
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def write_asset(name, content):
+    """Grava nome.<hash>.ext (+ .gz/.br) em static/dist e retorna o nome gravado."""
+    stem, extension = os.path.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    filename = f"{stem}.{digest}{extension}"
+    path = os.path.join(DIST_DIR, filename)
+    with open(path, "wb") as f:
+        f.write(content)
+    if extension in COMPRESSIBLE:
+        _write_compressed(path, content)
+    return filename
+
+
+def build(fetch=True):
+    """Gera todos os assets e o manifest.json; retorna o manifest."""
+    if fetch:
+        fetch_vendor()
+    outputs = {"app.css": build_css()}
+    for name, parts in BUNDLES.items():
+        outputs[name] = build_js(parts)
+
+    # Recria a pasta: arquivos de builds antigos não ficam para trás
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+    manifest = {name: write_asset(name, content) for name, content in outputs.items()}
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ============================================
+# USO NA APLICAÇÃO
+# ============================================
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_assets(app):
+    """Lê o manifest uma vez por processo (um novo build exige reiniciar)."""
+    app.extensions["assets_manifest"] = load_manifest()
+    if not app.extensions["assets_manifest"] and not app.debug:
+        app.logger.warning("static/dist/manifest.json não encontrado: usando os CDNs (rode 'flask construir-assets')")
+
+
+def asset_url(name):
+    """URL com hash de um asset construído ou None (templates usam os CDNs)."""
+    filename = current_app.extensions.get("assets_manifest", {}).get(name)
+    return url_for("asset", filename=filename) if filename else None
+
+
+def send_asset(filename):
+    """Envia a versão .br/.gz pré-comprimida aceita pelo cliente, se existir."""
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            encoding = candidate
+            filename += suffix
+            break
+
+    response = send_from_directory(DIST_DIR, filename, mimetype=mimetype, max_age=31536000)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
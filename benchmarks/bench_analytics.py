@@ -0,0 +1,120 @@
+"""
+Benchmark dos relatórios de vendas com 10M de linhas de pedido.
+
+Gera pedidos/linhas sintéticos espalhados por um ano, monta as tabelas de
+rollup com stats.rebuild_stats() e compara os relatórios do admin
+(faturamento por dia e produtos mais vendidos no mês) lendo o rollup
+(STATS_SUMMARY_TABLE = True) com a agregação direta em order/order_line.
+
+    python -m benchmarks.bench_analytics --lines 10000000
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+
+import stats
+from models import db
+
+LINES_PER_ORDER = 3
+
+
+def build_database(engine, args):
+    """Insere produtos, pedidos e linhas (sem triggers; o rollup vem depois)."""
+    db.metadata.create_all(engine)
+    start = datetime.datetime.now() - datetime.timedelta(days=args.days)
+    seconds = args.days * 86400
+    orders = args.lines // LINES_PER_ORDER
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.executemany(
+            "INSERT INTO product (id, name, price, image_file) VALUES (?, ?, ?, 'x.jpg')",
+            ((i, f"produto {i}", float(i % 200 + 10)) for i in range(1, args.products + 1)),
+        )
+        cursor.execute(
+            "INSERT INTO user (id, username, email, password_hash) VALUES (1, 'u', 'u@teste.com', 'x')"
+        )
+
+        def order_rows():
+            for order_id in range(1, orders + 1):
+                created_at = start + datetime.timedelta(seconds=order_id * seconds // orders)
+                yield (order_id, created_at.isoformat(sep=" "))
+
+        cursor.executemany(
+            'INSERT INTO "order" (id, user_id, name, email, address, city, zip_code, payment_method, total, items, created_at) '
+            "VALUES (?, 1, 'n', 'e', 'a', 'c', 'z', 'pix', 100.0, '[]', ?)",
+            order_rows(),
+        )
+
+        def line_rows():
+            for order_id, created_at in order_rows():
+                for _ in range(LINES_PER_ORDER):
+                    product_id = random.randint(1, args.products)
+                    yield (order_id, product_id, f"produto {product_id}", float(product_id % 200 + 10),
+                           random.randint(1, 3), created_at)
+
+        cursor.executemany(
+            "INSERT INTO order_line (order_id, product_id, name, unit_price, quantity, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            line_rows(),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def measure(app, label, report, repeat):
+    with app.app_context():
+        report()  # aquece o cache de páginas do SQLite
+        start = time.perf_counter()
+        for _ in range(repeat):
+            report()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:48s} {elapsed:10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            start = time.perf_counter()
+            build_database(db.engine, args)
+            print(f"Dados gerados: {args.lines} linhas de pedido em {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                stats.rebuild_stats(connection)
+            print(f"Rollups montados em {time.perf_counter() - start:.1f}s\n")
+
+        today = datetime.date.today()
+        month = (today - datetime.timedelta(days=29), today)
+        year = (today - datetime.timedelta(days=args.days), today)
+
+        for enabled, label in ((False, "direto em order/order_line"), (True, "rollup")):
+            app.config["STATS_SUMMARY_TABLE"] = enabled
+            print(f"== {label} ==")
+            measure(app, "faturamento por dia (30 dias)", lambda: stats.revenue_by_day(*month), args.repeat)
+            measure(app, "top 10 produtos (30 dias)", lambda: stats.product_sales(*month), args.repeat)
+            measure(app, "top 10 produtos (1 ano)", lambda: stats.product_sales(*year), args.repeat)
+            measure(app, "totais de pedidos/faturamento", stats.sales_totals, args.repeat)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark dos índices do carrinho com 1M de itens.
+
+Cria um SQLite temporário no esquema antigo (sem índices), mostra o plano de
+consulta das buscas do carrinho, aplica migrations.upgrade_database() e mede
+de novo.
+
+    python -m benchmarks.bench_cart_indexes --items 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from migrations import upgrade_database
+from models import db
+
+QUERIES = {
+    "Cart por user_id": (
+        "SELECT id FROM cart WHERE user_id = :user_id",
+        lambda args: {"user_id": random.randint(1, args.carts)},
+    ),
+    "CartItem por (cart_id, product_id)": (
+        "SELECT id, quantity FROM cart_item WHERE cart_id = :cart_id AND product_id = :product_id",
+        lambda args: {"cart_id": random.randint(1, args.carts), "product_id": random.randint(1, args.products)},
+    ),
+    "Order por user_id": (
+        'SELECT id, total FROM "order" WHERE user_id = :user_id',
+        lambda args: {"user_id": random.randint(1, args.carts)},
+    ),
+}
+
+
+def build_database(engine, args):
+    """Cria as tabelas sem índices e insere os dados sintéticos."""
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.executemany(
+            "INSERT INTO user (id, username, email, password_hash, is_admin) VALUES (?, ?, ?, 'x', 0)",
+            ((i, f"user{i}", f"user{i}@teste.com") for i in range(1, args.carts + 1)),
+        )
+        cursor.executemany(
+            "INSERT INTO product (id, name, price, image_file) VALUES (?, ?, 10.0, 'x.jpg')",
+            ((i, f"produto {i}") for i in range(1, args.products + 1)),
+        )
+        cursor.executemany(
+            "INSERT INTO cart (id, user_id) VALUES (?, ?)",
+            ((i, i) for i in range(1, args.carts + 1)),
+        )
+        per_cart = max(args.items // args.carts, 1)
+        cursor.executemany(
+            "INSERT INTO cart_item (cart_id, product_id, quantity) VALUES (?, ?, 1)",
+            ((n // per_cart + 1, n % per_cart + 1) for n in range(args.items)),
+        )
+        cursor.executemany(
+            'INSERT INTO "order" (user_id, name, email, address, city, zip_code, payment_method, total, items) '
+            "VALUES (?, 'n', 'e', 'a', 'c', 'z', 'pix', 10.0, '[]')",
+            ((random.randint(1, args.carts),) for _ in range(args.orders)),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def measure(engine, args, label):
+    print(f"\n== {label} ==")
+    with engine.connect() as connection:
+        for name, (sql, params) in QUERIES.items():
+            plan = connection.execute(text("EXPLAIN QUERY PLAN " + sql), params(args)).all()
+            start = time.perf_counter()
+            for _ in range(args.lookups):
+                connection.execute(text(sql), params(args)).all()
+            elapsed = (time.perf_counter() - start) / args.lookups * 1000
+            print(f"{name:38s} {elapsed:9.3f} ms/consulta   plano: {' | '.join(row[-1] for row in plan)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--carts", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        start = time.perf_counter()
+        build_database(engine, args)
+        print(f"Dados gerados: {args.items} itens de carrinho em {time.perf_counter() - start:.1f}s")
+
+        measure(engine, args, "ANTES (esquema antigo, sem índices)")
+
+        start = time.perf_counter()
+        created = upgrade_database(engine)
+        print(f"\nupgrade_database() criou {', '.join(created)} em {time.perf_counter() - start:.1f}s")
+
+        measure(engine, args, "DEPOIS (com índices)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark do login: custo de cada política de hash e do limitador.
+
+Mede quantos logins por segundo um núcleo aguenta com cada método de hash
+(o scrypt padrão e alternativas pbkdf2), o custo de uma chamada ao
+LoginRateLimiter e quantas tentativas recusadas por segundo o limitador
+descarta sem calcular hash nenhum.
+
+    python -m benchmarks.bench_login --seconds 2
+"""
+import argparse
+import time
+
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+import security
+
+METHODS = [
+    security.DEFAULT_HASH_METHOD,
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:100000",
+]
+PASSWORD = "senha-do-benchmark"
+
+
+class FakeUser:
+    def __init__(self, password_hash):
+        self.password_hash = password_hash
+
+
+def rate(function, seconds):
+    """Chamadas por segundo de function() durante ~seconds segundos."""
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        function()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--ips", type=int, default=1000, help="IPs distintos no teste do limitador")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print("== logins com sucesso por segundo (1 núcleo) ==")
+    for method in METHODS:
+        app.config["PASSWORD_HASH_METHOD"] = method
+        user = FakeUser(generate_password_hash(PASSWORD, method=method))
+        with app.app_context():
+            per_second = rate(lambda: security.verify_password(user, PASSWORD), args.seconds)
+        print(f"{method:28s} {per_second:10.1f} logins/s {1000 / per_second:10.2f} ms/login")
+
+    print("\n== limitador ==")
+    limiter = security.LoginRateLimiter((20, 60), (5, 300))
+    counter = iter(range(10**12))
+    allowed_cost = rate(lambda: limiter.allow(f"10.0.{next(counter) % args.ips}.1", "a@teste.com"), args.seconds)
+    print(f"{'allow() (chaves variadas)':28s} {1e6 / allowed_cost:10.2f} µs/chamada")
+
+    # Um único IP esgota o balde: daí em diante tudo é recusado antes do hash
+    blocked = security.LoginRateLimiter((20, 60), (5, 300))
+    while blocked.allow("10.9.9.9", "alvo@teste.com"):
+        pass
+    rejected = rate(lambda: blocked.allow("10.9.9.9", "alvo@teste.com"), args.seconds)
+    print(f"{'tentativas recusadas':28s} {rejected:10.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark da busca: FTS5 (search.py) contra LIKE '%termo%' em 100k notícias.
+
+Cria um SQLite temporário, gera as notícias com um vocabulário sintético,
+indexa com search.init_search() e compara o tempo das duas consultas.
+
+    python -m benchmarks.bench_search --articles 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+import search
+from models import db
+
+VOCABULARY_SIZE = 20_000
+TERMS = ["campeonato", "vitoria", "final", "transferencia", "patrocinio"]
+MISSING_TERMS = ["inexistente"]  # o LIKE precisa varrer a tabela inteira
+
+LIKE_SQL = (
+    "SELECT id, title FROM news "
+    "WHERE title LIKE :pattern OR description LIKE :pattern "
+    "ORDER BY created_at DESC LIMIT :limit"
+)
+
+
+def build_database(engine, args):
+    """Cria as tabelas e insere as notícias sintéticas."""
+    db.metadata.create_all(engine)
+    words = [f"palavra{i}" for i in range(VOCABULARY_SIZE)] + TERMS
+
+    def sentence(size):
+        return " ".join(random.choice(words) for _ in range(size))
+
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO news (title, description, image_file, created_at) "
+            "VALUES (?, ?, 'x.jpg', datetime('now', ?))",
+            ((sentence(8), sentence(args.words), f"-{i} minutes") for i in range(args.articles)),
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def measure(label, run, args, terms=TERMS):
+    start = time.perf_counter()
+    for term in terms * args.repeat:
+        run(term)
+    elapsed = (time.perf_counter() - start) / (len(terms) * args.repeat) * 1000
+    print(f"{label:36s} {elapsed:9.3f} ms/consulta")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=120, help="palavras por descrição")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        start = time.perf_counter()
+        build_database(engine, args)
+        print(f"Dados gerados: {args.articles} notícias em {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        search.init_search(engine)
+        print(f"Índice FTS5 criado em {time.perf_counter() - start:.1f}s\n")
+
+        with engine.connect() as connection:
+            def like(term):
+                return connection.execute(
+                    text(LIKE_SQL), {"pattern": f"%{term}%", "limit": search.SEARCH_LIMIT}
+                ).all()
+
+            measure("LIKE '%termo%' (varredura)", like, args)
+            measure("LIKE '%termo%' sem resultado", like, args, MISSING_TERMS)
+            measure("FTS5 MATCH + bm25", lambda term: search.search(connection, term), args)
+            measure(
+                "FTS5 sem resultado",
+                lambda term: search.search(connection, term),
+                args,
+                MISSING_TERMS,
+            )
+            measure(
+                "FTS5 prefixo (3 letras)",
+                lambda term: search.search(connection, term[:3]),
+                args,
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
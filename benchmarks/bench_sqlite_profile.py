@@ -0,0 +1,131 @@
+"""
+Benchmark de leitura com escritas concorrentes: perfil padrão x perfil tunado.
+
+Simula o gunicorn com vários processos lendo o catálogo/notícias enquanto um
+processo grava no carrinho sem parar, e compara o throughput de leitura e os
+erros "database is locked" com o journal padrão (DELETE) e com
+db_profile.DEFAULT_SQLITE_PRAGMAS (WAL, synchronous=NORMAL, ...).
+
+    python -m benchmarks.bench_sqlite_profile --readers 4 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from db_profile import DEFAULT_SQLITE_PRAGMAS, apply_sqlite_pragmas
+from models import db
+
+# Perfil "antes": o que o SQLite faz sem configuração (timeout padrão do pysqlite)
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL"}
+
+READ_QUERIES = [
+    "SELECT * FROM product ORDER BY id",
+    "SELECT * FROM news ORDER BY created_at DESC, id DESC LIMIT 10",
+    "SELECT * FROM match ORDER BY date, time LIMIT 5",
+]
+
+
+def make_engine(path, pragmas):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 1})
+    apply_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def build_database(path, pragmas):
+    engine = make_engine(path, pragmas)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO user (id, username, email, password_hash) VALUES (1, 'u', 'u@teste.com', 'x')"))
+        connection.execute(text("INSERT INTO cart (id, user_id) VALUES (1, 1)"))
+        connection.execute(
+            text("INSERT INTO product (name, price, image_file, rating, reviews) VALUES (:name, 10.0, 'x.jpg', 5, 0)"),
+            [{"name": f"produto {i}"} for i in range(200)],
+        )
+        connection.execute(
+            text("INSERT INTO news (title, description, image_file, created_at) VALUES (:title, :description, 'x.jpg', CURRENT_TIMESTAMP)"),
+            [{"title": f"notícia {i}", "description": "texto " * 50} for i in range(500)],
+        )
+        connection.execute(
+            text("INSERT INTO match (tournament, opponent, date, time) VALUES ('Liga', :opponent, '2026-01-01', '20:00:00.000000')"),
+            [{"opponent": f"time {i}"} for i in range(100)],
+        )
+    engine.dispose()
+
+
+def reader(path, pragmas, deadline, results):
+    engine = make_engine(path, pragmas)
+    reads = errors = 0
+    while time.time() < deadline:
+        try:
+            with engine.connect() as connection:
+                connection.execute(text(random.choice(READ_QUERIES))).all()
+            reads += 1
+        except OperationalError:
+            errors += 1
+    results.put(("read", reads, errors))
+
+
+def writer(path, pragmas, deadline, results):
+    engine = make_engine(path, pragmas)
+    writes = errors = 0
+    while time.time() < deadline:
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    text(
+                        "INSERT INTO cart_item (cart_id, product_id, quantity) VALUES (1, :product_id, 1) "
+                        "ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = quantity + 1"
+                    ),
+                    {"product_id": random.randint(1, 200)},
+                )
+            writes += 1
+        except OperationalError:
+            errors += 1
+    results.put(("write", writes, errors))
+
+
+def run(label, pragmas, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, pragmas)
+
+        results = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        processes = [multiprocessing.Process(target=writer, args=(path, pragmas, deadline, results)) for _ in range(args.writers)]
+        processes += [multiprocessing.Process(target=reader, args=(path, pragmas, deadline, results)) for _ in range(args.readers)]
+        for process in processes:
+            process.start()
+        totals = {"read": [0, 0], "write": [0, 0]}
+        for _ in processes:
+            kind, count, errors = results.get()
+            totals[kind][0] += count
+            totals[kind][1] += errors
+        for process in processes:
+            process.join()
+
+    reads, read_errors = totals["read"]
+    writes, write_errors = totals["write"]
+    print(f"{label:10s} leituras {reads / args.seconds:10.0f}/s  (erros {read_errors:5d})   "
+          f"escritas {writes / args.seconds:8.0f}/s  (erros {write_errors:5d})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.readers} leitores + {args.writers} escritor(es) por {args.seconds:.0f}s\n")
+    run("padrão", BASELINE_PRAGMAS, args)
+    run("tunado", DEFAULT_SQLITE_PRAGMAS, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Gerador de dados sintéticos para os testes de carga (benchmarks/load_test.py).
+
+Cria um banco novo com usuários, produtos, notícias, jogadores, partidas,
+carrinhos e milhões de pedidos, usando executemany direto no driver (sem
+ORM e sem triggers: busca, estatísticas e feeds são montados no fim, de uma
+vez). Com o mesmo --seed o banco sai sempre igual (as datas são relativas
+ao dia da geração); para comparar commits, gere o banco uma vez e rode os
+testes de carga dos dois sobre cópias dele.
+
+    python -m benchmarks.dataset --database /tmp/carga.db --orders 1000000
+
+Todos os usuários têm a senha PASSWORD (carga{n}@teste.com, n a partir de 1).
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+from flask import Flask
+from sqlalchemy import create_engine, event, func, select
+from werkzeug.security import generate_password_hash
+
+import feeds
+import search
+import security
+import stats
+from models import db
+
+PASSWORD = "carga123"
+EMAIL = "carga{}@teste.com"
+
+DEFAULTS = {
+    "users": 10_000,
+    "products": 500,
+    "news": 50_000,
+    "players": 40,
+    "sponsors": 12,
+    "matches": 2_000,
+    "carts": 5_000,
+    "orders": 1_000_000,
+}
+MAX_CART_ITEMS = 8
+MAX_ORDER_LINES = 4
+
+TAGS = [None, None, None, "NOVO", "BEST SELLER", "PROMO"]
+PRODUCT_KINDS = ["Camiseta", "Moletom", "Boné", "Mousepad", "Jersey", "Adesivo", "Caneca", "Chaveiro"]
+GAMES = ["League of Legends", "Counter-Strike 2", "Valorant", "Free Fire", "Rainbow Six"]
+OPPONENTS = ["LOUD", "FURIA", "MIBR", "paiN Gaming", "Red Canids", "Fluxo", "Imperial", "Vivo Keyd"]
+TOURNAMENTS = ["CBLOL", "CS Major Qualifier", "Valorant Masters", "LBFF", "Brasileirão R6"]
+PAYMENT_METHODS = ["pix", "credit_card", "boleto"]
+WORDS = (
+    "time vitória campeonato rodada final jogador treino torcida temporada estreia "
+    "classificação virada estratégia mapa partida lineup técnico patrocínio arena"
+).split()
+
+
+def _datetime(value):
+    # Mesmo texto que o SQLAlchemy grava em colunas DateTime no SQLite
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+# ============================================
+# GERAÇÃO DAS TABELAS
+# ============================================
+
+def _insert(cursor, table, columns, rows):
+    placeholders = ", ".join("?" for _ in columns)
+    cursor.executemany(
+        f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})', rows
+    )
+
+
+def _products(rng, count):
+    for product_id in range(1, count + 1):
+        kind = PRODUCT_KINDS[product_id % len(PRODUCT_KINDS)]
+        yield (
+            product_id, f"{kind} RoyaleHub #{product_id}",
+            round(rng.uniform(19.9, 399.9), 2), "b421427db5554363.jpg",
+            rng.randint(3, 5), rng.randint(0, 2_000), rng.choice(TAGS),
+        )
+
+
+def generate(engine, counts, seed, now=None):
+    """Preenche um banco vazio (tabelas já criadas, sem triggers)."""
+    rng = random.Random(seed)
+    # Datas relativas ao dia da geração: sempre há partidas futuras na agenda
+    now = now or datetime.datetime.combine(datetime.date.today(), datetime.time(12, 0))
+    year = 365 * 86400
+    password_hash = generate_password_hash(PASSWORD, method=security.DEFAULT_HASH_METHOD)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        _insert(cursor, "user", ("id", "username", "email", "password_hash", "is_admin", "created_at"), (
+            (user_id, f"carga{user_id}", EMAIL.format(user_id), password_hash, user_id == 1,
+             _datetime(now - datetime.timedelta(seconds=rng.randrange(year))))
+            for user_id in range(1, counts["users"] + 1)
+        ))
+
+        products = list(_products(rng, counts["products"]))
+        _insert(cursor, "product", ("id", "name", "price", "image_file", "rating", "reviews", "tag"), products)
+        prices = {row[0]: (row[1], row[2]) for row in products}
+
+        _insert(cursor, "news", ("id", "title", "description", "image_file", "link", "created_at"), (
+            (news_id, _sentence(rng, 6), _sentence(rng, 40), "test_news_1.jpg", "#",
+             _datetime(now - datetime.timedelta(seconds=news_id * year // max(counts["news"], 1))))
+            for news_id in range(1, counts["news"] + 1)
+        ))
+
+        _insert(cursor, "player", ("id", "name", "role", "game", "image_file"), (
+            (player_id, f"Jogador {player_id}", rng.choice(["Capitão", "Suporte", "Entry", "Sniper"]),
+             rng.choice(GAMES), "player.jpg")
+            for player_id in range(1, counts["players"] + 1)
+        ))
+
+        _insert(cursor, "sponsor", ("id", "name", "logo_file", "website"), (
+            (sponsor_id, f"Patrocinador {sponsor_id}", "sponsor.png", "https://example.com")
+            for sponsor_id in range(1, counts["sponsors"] + 1)
+        ))
+
+        # Partidas espalhadas entre um ano atrás e um ano à frente
+        def match_rows():
+            for match_id in range(1, counts["matches"] + 1):
+                starts_at = now + datetime.timedelta(
+                    seconds=rng.randrange(-year, year) // 1800 * 1800
+                )
+                yield (match_id, f"{rng.choice(TOURNAMENTS)} - Semana {rng.randint(1, 12)}",
+                       rng.choice(OPPONENTS), starts_at.strftime("%Y-%m-%d"),
+                       starts_at.strftime("%H:%M:%S.%f"), _datetime(now))
+
+        _insert(cursor, "match", ("id", "tournament", "opponent", "date", "time", "updated_at"), match_rows())
+
+        # Um carrinho para cada um dos primeiros usuários, sem produto repetido
+        cart_users = min(counts["carts"], counts["users"])
+        _insert(cursor, "cart", ("id", "user_id"), ((cart_id, cart_id) for cart_id in range(1, cart_users + 1)))
+
+        def cart_item_rows():
+            for cart_id in range(1, cart_users + 1):
+                size = rng.randint(1, min(MAX_CART_ITEMS, counts["products"]))
+                for product_id in rng.sample(range(1, counts["products"] + 1), size):
+                    yield (cart_id, product_id, rng.randint(1, 3))
+
+        _insert(cursor, "cart_item", ("cart_id", "product_id", "quantity"), cart_item_rows())
+
+        # Pedidos e linhas gerados juntos: o total e o JSON batem com as linhas
+        order_lines = []
+
+        def order_rows():
+            for order_id in range(1, counts["orders"] + 1):
+                created_at = _datetime(now - datetime.timedelta(seconds=year - order_id * year // counts["orders"]))
+                user_id = rng.randint(1, counts["users"])
+                items, total = [], 0.0
+                for product_id in rng.sample(range(1, counts["products"] + 1), rng.randint(1, MAX_ORDER_LINES)):
+                    name, price = prices[product_id]
+                    quantity = rng.randint(1, 3)
+                    total += price * quantity
+                    items.append({"name": name, "quantity": quantity, "price": price})
+                    order_lines.append((order_id, product_id, name, price, quantity, created_at))
+                yield (
+                    order_id, user_id, f"carga{user_id}", EMAIL.format(user_id), "Rua do Benchmark, 1",
+                    "São Paulo", "01000-000", rng.choice(PAYMENT_METHODS), round(total, 2),
+                    json.dumps(items, ensure_ascii=False), created_at, f"carga-{order_id}",
+                )
+
+        order_columns = ("id", "user_id", "name", "email", "address", "city", "zip_code",
+                         "payment_method", "total", "items", "created_at", "idempotency_key")
+        line_columns = ("order_id", "product_id", "name", "unit_price", "quantity", "created_at")
+        rows = order_rows()
+        while True:
+            # Em lotes: as linhas de cada lote de pedidos são gravadas em seguida
+            batch = [row for _, row in zip(range(10_000), rows)]
+            if not batch:
+                break
+            _insert(cursor, "order", order_columns, batch)
+            _insert(cursor, "order_line", line_columns, order_lines)
+            order_lines.clear()
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def build(database, counts=None, seed=1):
+    """Apaga e recria o banco em 'database'; retorna as linhas por tabela."""
+    counts = {**DEFAULTS, **(counts or {})}
+    if os.path.exists(database):
+        os.remove(database)
+
+    engine = create_engine(f"sqlite:///{database}")
+
+    @event.listens_for(engine, "connect")
+    def fast_load(dbapi_connection, connection_record):
+        # Só durante a carga: se ela falhar, o arquivo é descartável
+        dbapi_connection.execute("PRAGMA journal_mode = OFF")
+        dbapi_connection.execute("PRAGMA synchronous = OFF")
+        dbapi_connection.execute("PRAGMA cache_size = -262144")
+
+    db.metadata.create_all(engine)
+    generate(engine, counts, seed)
+
+    # Índice da busca, rollups e triggers, como o seed.py faz
+    app = Flask(__name__)
+    with app.app_context():
+        search.init_search(engine, rebuild=True)
+        stats.init_stats(engine)
+        feeds.init_feeds(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+        tables = table_sizes(connection)
+    engine.dispose()
+    return tables
+
+
+def table_sizes(connection):
+    """Linhas por tabela (vai junto no resultado dos testes de carga)."""
+    return {
+        table.name: connection.execute(select(func.count()).select_from(table)).scalar()
+        for table in db.metadata.sorted_tables
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="arquivo SQLite (é recriado)")
+    parser.add_argument("--seed", type=int, default=1)
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name}", type=int, default=default)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables = build(args.database, {name: getattr(args, name) for name in DEFAULTS}, args.seed)
+    for table, rows in tables.items():
+        print(f"{table:28s} {rows:12d}")
+    print(f"\nBanco {args.database} gerado em {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Teste de carga reproduzível: roteiros de benchmarks/scenarios.py contra uma
+cópia de um banco gerado por benchmarks/dataset.py.
+
+Mede vazão (requisições/s) e latência p50/p95/p99 por passo (home, loja,
+api_cart, add_to_cart, checkout...) e grava tudo em JSON com o commit
+atual, para comparar dois commits sobre os mesmos dados:
+
+    python -m benchmarks.dataset --database /tmp/carga.db
+    python -m benchmarks.load_test executar --database /tmp/carga.db --modo processo
+    python -m benchmarks.load_test executar --database /tmp/carga.db --modo gunicorn --workers 4
+    python -m benchmarks.load_test comparar antes.json depois.json
+
+No modo 'processo' os usuários virtuais são threads chamando o app direto
+(sem rede: mede a aplicação); no modo 'gunicorn' o app sobe em um gunicorn
+de verdade e as requisições vão por HTTP. Com --url o teste roda contra um
+servidor que já está no ar (usando o banco que ele estiver usando).
+"""
+import argparse
+import datetime
+import importlib
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.request
+
+from sqlalchemy import create_engine
+
+from benchmarks import dataset, scenarios
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCENTILES = (50, 95, 99)
+DEFAULT_MIX = "navegacao=9,compra=1"
+FIRST_USER = 2  # o usuário 1 do dataset é admin
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def parse_mix(value):
+    """'navegacao=9,compra=1' -> ([nomes], [pesos])."""
+    names, weights = [], []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in scenarios.SCENARIOS:
+            raise argparse.ArgumentTypeError(f"roteiro desconhecido: {name.strip()}")
+        names.append(name.strip())
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def run_users(make_client, args):
+    """Roda os usuários virtuais (uma thread cada) e devolve todas as amostras."""
+    names, weights = args.mix
+    deadline = time.perf_counter() + args.warmup + args.seconds
+    users = []
+
+    def worker(index):
+        user = scenarios.VirtualUser(make_client(), FIRST_USER + index, random.Random(args.seed * 100_003 + index))
+        users.append(user)
+        while time.perf_counter() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            try:
+                scenarios.SCENARIOS[name](user)
+            except Exception as error:  # a rodada continua; o erro entra no relatório
+                if not isinstance(error, scenarios.ScenarioError):
+                    traceback.print_exc()
+                user.fail(f"{name}:erro")
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Descarta o aquecimento (caches frios, primeiros logins)
+    measured_from = started + args.warmup
+    samples = [sample for user in users for sample in user.samples if sample.started >= measured_from]
+    return samples, time.perf_counter() - measured_from
+
+
+def _app_environment(args, database, workdir):
+    # Banco e instance/ (versões do cache, métricas) da cópia, nunca os do site
+    return {
+        "DATABASE_URL": f"sqlite:///{database}",
+        "INSTANCE_PATH": os.path.join(workdir, "instance"),
+        "LOG_LEVEL": args.log_level,
+    }
+
+
+def _in_process(args, database, workdir):
+    os.environ.update(_app_environment(args, database, workdir))
+    app = importlib.import_module("benchmarks.wsgi").app
+    return run_users(lambda: scenarios.FlaskClient(app), args)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"o servidor não respondeu em {url}")
+
+
+def _under_gunicorn(args, database, workdir):
+    port = _free_port()
+    env = dict(os.environ, **_app_environment(args, database, workdir))
+    command = [
+        sys.executable, "-m", "gunicorn", "benchmarks.wsgi:app",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers), "--threads", str(args.threads),
+    ]
+    log_path = os.path.join(workdir, "gunicorn.log")
+    with open(log_path, "wb") as log:
+        server = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        _wait_until_up(base_url + "/")
+        return run_users(lambda: scenarios.HttpClient(base_url), args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        if server.returncode not in (0, -15):
+            print(f"gunicorn terminou com código {server.returncode}; log em {log_path}")
+
+
+# ============================================
+# RELATÓRIO
+# ============================================
+
+def percentile(sorted_values, p):
+    """Percentil pelo posto mais próximo (valores já ordenados)."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(sample.seconds for sample in samples if sample.ok)
+    summary = {
+        "requests": len(samples),
+        "errors": sum(not sample.ok for sample in samples),
+        "rps": round(len(samples) / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+    }
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        summary[f"p{p}_ms"] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def build_report(args, samples, seconds, tables):
+    steps = {}
+    for sample in samples:
+        steps.setdefault(sample.step, []).append(sample)
+    return {
+        **git_revision(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "mode": "url" if args.url else args.modo,
+        "options": {
+            "users": args.users, "seconds": args.seconds, "warmup": args.warmup, "seed": args.seed,
+            "mix": dict(zip(*args.mix)), "workers": args.workers, "threads": args.threads,
+            "python": sys.version.split()[0],
+        },
+        "tables": tables,
+        "duration_s": round(seconds, 3),
+        "overall": summarize(samples, seconds),
+        "steps": {name: summarize(step_samples, seconds) for name, step_samples in sorted(steps.items())},
+    }
+
+
+def print_report(report):
+    header = f"{'passo':16s} {'req':>8s} {'erros':>6s} {'req/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["steps"].items()) + [("TOTAL", report["overall"])]
+    for name, summary in rows:
+        print(
+            f"{name:16s} {summary['requests']:8d} {summary['errors']:6d} {summary['rps']:9.1f} "
+            + " ".join(f"{summary[f'p{p}_ms'] or 0:9.2f}" for p in PERCENTILES)
+        )
+
+
+def execute(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        tables = {}
+        database = None
+        if not args.url:
+            if not os.path.exists(args.database):
+                sys.exit(f"{args.database} não existe: gere com python -m benchmarks.dataset")
+            # Os pedidos do teste não sujam o banco original: cada rodada parte do mesmo estado
+            database = os.path.join(workdir, "carga.db")
+            shutil.copyfile(args.database, database)
+            engine = create_engine(f"sqlite:///{database}")
+            with engine.connect() as connection:
+                tables = dataset.table_sizes(connection)
+            engine.dispose()
+
+        if args.url:
+            samples, seconds = run_users(lambda: scenarios.HttpClient(args.url), args)
+        elif args.modo == "gunicorn":
+            samples, seconds = _under_gunicorn(args, database, workdir)
+        else:
+            samples, seconds = _in_process(args, database, workdir)
+
+    report = build_report(args, samples, seconds, tables)
+    print_report(report)
+    output = args.output or f"carga-{(report['commit'] or 'sem-commit')[:10]}-{report['mode']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultado gravado em {output}")
+
+
+# ============================================
+# COMPARAÇÃO
+# ============================================
+
+def _change(before, after):
+    if before is None or after is None:
+        return "-"
+    if not before:
+        return "novo" if after else "0%"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(args):
+    with open(args.antes, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.depois, encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"antes:  {before.get('commit')} ({before.get('mode')})")
+    print(f"depois: {after.get('commit')} ({after.get('mode')})\n")
+    if before.get("tables") != after.get("tables"):
+        print("ATENÇÃO: os bancos dos dois resultados não têm as mesmas contagens de linhas\n")
+
+    metrics = ["rps"] + [f"p{p}_ms" for p in PERCENTILES]
+    print(f"{'passo':16s} " + " ".join(f"{metric:>22s}" for metric in metrics))
+    steps = sorted(set(before["steps"]) | set(after["steps"]))
+    rows = [(name, before["steps"].get(name, {}), after["steps"].get(name, {})) for name in steps]
+    rows.append(("TOTAL", before["overall"], after["overall"]))
+    for name, old, new in rows:
+        cells = []
+        for metric in metrics:
+            old_value, new_value = old.get(metric), new.get(metric)
+            shown = f"{new_value:.1f}" if new_value is not None else "-"
+            cells.append(f"{shown:>12s} {_change(old_value, new_value):>9s}")
+        print(f"{name:16s} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("executar", help="roda os roteiros e grava o resultado em JSON")
+    run.add_argument("--database", default="/tmp/carga.db", help="banco gerado pelo benchmarks.dataset")
+    run.add_argument("--modo", choices=["processo", "gunicorn"], default="processo")
+    run.add_argument("--url", help="servidor já no ar (ignora --database e --modo)")
+    run.add_argument("--users", type=int, default=8, help="usuários virtuais simultâneos")
+    run.add_argument("--seconds", type=float, default=30.0, help="duração medida")
+    run.add_argument("--warmup", type=float, default=5.0, help="segundos iniciais descartados")
+    run.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"pesos dos roteiros ({DEFAULT_MIX})")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--workers", type=int, default=4, help="workers do gunicorn")
+    run.add_argument("--threads", type=int, default=1, help="threads por worker do gunicorn")
+    run.add_argument("--log-level", default="WARNING", help="LOG_LEVEL do app durante o teste")
+    run.add_argument("--output", help="arquivo JSON (padrão: carga-<commit>-<modo>.json)")
+    run.set_defaults(handler=execute)
+
+    diff = commands.add_parser("comparar", help="compara dois resultados")
+    diff.add_argument("antes")
+    diff.add_argument("depois")
+    diff.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Roteiros dos testes de carga: o que cada usuário virtual faz no site.
+
+Cada roteiro é uma função que recebe um VirtualUser e chama user.step()
+para cada requisição; cada passo vira uma amostra (nome, duração, sucesso).
+O mesmo roteiro roda com o cliente em processo (test_client do Flask, mede
+só a aplicação) ou com o cliente HTTP (contra o gunicorn, mede também o
+servidor). Redirects não são seguidos: cada passo é uma requisição só.
+"""
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+from benchmarks.dataset import EMAIL, PASSWORD
+
+Sample = namedtuple("Sample", ["step", "started", "seconds", "ok"])
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" value="([^"]+)"')
+IDEMPOTENCY_KEY = re.compile(r'name="idempotency_key" value="([^"]+)"')
+PRODUCT_ID = re.compile(r"\bid: (\d+),")  # dados do modal de compra (Alpine) na /loja
+
+CHECKOUT_FORM = {
+    "name": "Usuário de Carga",
+    "address": "Rua do Benchmark, 1",
+    "city": "São Paulo",
+    "zip_code": "01000-000",
+    "payment_method": "pix",
+}
+
+
+class ScenarioError(Exception):
+    """A página não tinha o que o roteiro precisava (token, produto...)."""
+
+
+# ============================================
+# CLIENTES
+# ============================================
+
+class FlaskClient:
+    """Requisições direto no app (sem rede nem servidor)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get("Location", ""), response.get_data(as_text=True)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None  # o 302 volta como HTTPError e vira o resultado do passo
+
+
+class HttpClient:
+    """Requisições HTTP de verdade, com cookies (uma sessão por usuário virtual)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return response.status, response.headers.get("Location", ""), response.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as error:
+            with error:
+                return error.code, error.headers.get("Location", ""), error.read().decode("utf-8", "replace")
+
+
+# ============================================
+# USUÁRIO VIRTUAL
+# ============================================
+
+class VirtualUser:
+    """Uma sessão de navegação: cliente próprio, usuário do banco e RNG próprios."""
+
+    def __init__(self, client, number, rng):
+        self.client = client
+        self.email = EMAIL.format(number)
+        self.rng = rng
+        self.samples = []
+        self.logged_in = False
+
+    def step(self, name, method, path, data=None, expect=200, location=None):
+        """Faz uma requisição e registra a amostra; retorna o corpo."""
+        started = time.perf_counter()
+        status, redirect_to, body = self.client.request(method, path, data)
+        seconds = time.perf_counter() - started
+        ok = status == expect and (location is None or urllib.parse.urlsplit(redirect_to).path == location)
+        self.samples.append(Sample(name, started, seconds, ok))
+        return body
+
+    def fail(self, name):
+        self.samples.append(Sample(name, time.perf_counter(), 0.0, False))
+
+    def login(self):
+        self.step("login", "POST", "/login", {"email": self.email, "password": PASSWORD}, expect=302, location="/")
+        self.logged_in = True
+
+
+def _find(pattern, page, what):
+    match = pattern.search(page)
+    if not match:
+        raise ScenarioError(what)
+    return match.group(1)
+
+
+# ============================================
+# ROTEIROS
+# ============================================
+
+def browse(user):
+    """Visitante: home, loja e a gaveta do carrinho."""
+    user.step("home", "GET", "/")
+    user.step("loja", "GET", "/loja")
+    user.step("api_cart", "GET", "/api/cart")
+
+
+def buy(user):
+    """Cliente logado: escolhe dois produtos na loja, confere o carrinho e fecha o pedido."""
+    if not user.logged_in:
+        user.login()
+    page = user.step("loja", "GET", "/loja")
+    token = _find(CSRF_TOKEN, page, "csrf_token na /loja")
+    products = sorted(set(PRODUCT_ID.findall(page)))
+    if not products:
+        raise ScenarioError("nenhum produto na /loja")
+    for product_id in user.rng.sample(products, min(2, len(products))):
+        user.step("add_to_cart", "POST", f"/add-to-cart/{product_id}", {"csrf_token": token},
+                  expect=302, location="/loja")
+    user.step("api_cart", "GET", "/api/cart")
+
+    page = user.step("checkout_form", "GET", "/checkout")
+    form = dict(
+        CHECKOUT_FORM,
+        email=user.email,
+        csrf_token=_find(CSRF_TOKEN, page, "csrf_token no /checkout"),
+        idempotency_key=_find(IDEMPOTENCY_KEY, page, "idempotency_key no /checkout"),
+    )
+    user.step("checkout", "POST", "/checkout", form, expect=302, location="/confirmation")
+
+
+SCENARIOS = {
+    "navegacao": browse,
+    "compra": buy,
+}
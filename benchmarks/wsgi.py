@@ -0,0 +1,31 @@
+"""
+O app.py de sempre preparado para os testes de carga (benchmarks/load_test.py).
+
+Duas diferenças, ambas só no login: todos os usuários virtuais saem do
+mesmo IP, então o limitador de tentativas ganha um limite que nunca é
+atingido, e o POST /login fica fora do CSRF (o formulário de login não
+envia csrf_token). O resto, inclusive o CSRF do carrinho e do checkout,
+continua igual.
+
+O banco (DATABASE_URL) e a pasta instance/ (INSTANCE_PATH: versões do
+cache e arquivos de métricas) precisam ser de fora do site: sem eles o
+teste alteraria o banco, o cache e o /metrics de verdade.
+
+    DATABASE_URL=sqlite:////tmp/carga/carga.db INSTANCE_PATH=/tmp/carga/instance \
+        gunicorn -w 4 benchmarks.wsgi:app
+"""
+import os
+
+for variable in ("DATABASE_URL", "INSTANCE_PATH"):
+    if not os.environ.get(variable):
+        raise RuntimeError(f"defina {variable} para os testes de carga (ver benchmarks/wsgi.py)")
+
+import app as site
+import security
+
+UNLIMITED = (1_000_000_000, 1)
+
+site.login_limiter = security.LoginRateLimiter(UNLIMITED, UNLIMITED)
+site.csrf.exempt(site.login)
+
+app = site.app
@@ -0,0 +1,342 @@
+import csv
+import datetime
+import io
+import json
+import math
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Match, News, Player, Product, Sponsor
+
+# ============================================
+# IMPORTAÇÃO / EXPORTAÇÃO EM MASSA (CSV / JSONL)
+# ============================================
+# Os arquivos são lidos linha a linha (memória constante): cada linha é
+# validada e as válidas são gravadas em lotes de CHUNK_SIZE com um único
+# INSERT executemany + commit por lote. A exportação usa yield_per, então
+# nunca carrega a tabela inteira.
+#
+# Colunas de imagem recebem só o nome de um arquivo já existente em
+# static/uploads/<pasta>/ (os uploads continuam sendo feitos pelo admin).
+
+CHUNK_SIZE = 1000
+EXPORT_BUFFER_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 50
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def _text(max_length=None):
+    def parse(value):
+        value = str(value).strip()
+        if max_length and len(value) > max_length:
+            raise ValueError(f"mais de {max_length} caracteres")
+        return value
+    return parse
+
+
+def _price(value):
+    # float() aceita 'nan' e 'inf': preço não finito quebra ordenação, filtros e somas
+    price = float(str(value).replace(",", "."))
+    if not math.isfinite(price):
+        raise ValueError("não é um número")
+    if price < 0:
+        raise ValueError("negativo")
+    return price
+
+
+def _date(value):
+    return datetime.date.fromisoformat(str(value).strip())
+
+
+def _time(value):
+    return datetime.time.fromisoformat(str(value).strip())
+
+
+def _datetime(value):
+    return datetime.datetime.fromisoformat(str(value).strip())
+
+
+# entidade (como nas URLs do admin): (modelo, {coluna: (parser, obrigatória)})
+ENTITIES = {
+    "matches": (Match, {
+        "tournament": (_text(140), True),
+        "opponent": (_text(140), True),
+        "date": (_date, True),
+        "time": (_time, True),
+    }),
+    "products": (Product, {
+        "name": (_text(140), True),
+        "price": (_price, True),
+        "image_file": (_text(300), True),
+        "rating": (int, False),
+        "reviews": (int, False),
+        "tag": (_text(50), False),
+    }),
+    "players": (Player, {
+        "name": (_text(80), True),
+        "role": (_text(80), True),
+        "game": (_text(60), False),
+        "image_file": (_text(300), True),
+        "twitter": (_text(300), False),
+        "instagram": (_text(300), False),
+        "youtube": (_text(300), False),
+        "twitch": (_text(300), False),
+    }),
+    "news": (News, {
+        "title": (_text(140), True),
+        "description": (_text(), True),
+        "image_file": (_text(300), True),
+        "link": (_text(300), False),
+        "created_at": (_datetime, False),
+    }),
+    "sponsors": (Sponsor, {
+        "name": (_text(140), True),
+        "logo_file": (_text(300), True),
+        "website": (_text(300), False),
+    }),
+}
+
+
+# Coluna de imagem de cada entidade (a pasta em static/uploads tem o mesmo nome)
+FILE_COLUMNS = {
+    "products": "image_file",
+    "players": "image_file",
+    "news": "image_file",
+    "sponsors": "logo_file",
+}
+
+# Campos editáveis em massa: {entidade: {coluna: rótulo}}
+BULK_EDIT_FIELDS = {
+    "products": {"tag": "Tag", "price": "Preço"},
+    "matches": {"tournament": "Torneio", "date": "Data", "time": "Hora"},
+    "players": {"game": "Jogo", "role": "Função"},
+}
+BULK_MAX_IDS = 5000  # bem abaixo do limite de parâmetros do SQLite
+
+
+class ImportResult:
+    """
+    Resumo de uma importação: linhas gravadas e erros (linha, mensagem).
+    stopped_at é a linha em que a leitura parou se o arquivo estava ilegível
+    (as linhas anteriores a ela continuam gravadas).
+    """
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.stopped_at = None
+
+    def add_error(self, line, message, count=1):
+        self.failed += count
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+class UnreadableFile(ValueError):
+    """O resto do arquivo não pode ser lido (codificação ou CSV malformado)."""
+
+
+def detect_format(filename):
+    """Formato pelo nome do arquivo (.csv ou .jsonl); None se não suportado."""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return extension if extension in FORMATS else None
+
+
+def iter_records(stream, fmt):
+    """
+    Lê um arquivo binário linha a linha e gera (número_da_linha, dict).
+    Linhas JSON inválidas geram (linha, ValueError) para serem reportadas.
+    Se o arquivo deixa de ser legível (não é UTF-8, CSV malformado) gera
+    (linha, UnreadableFile) e para.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream, strict=True)  # aspas sem fechar viram erro
+        try:
+            for record in reader:
+                yield reader.line_num, record
+        # line_num ainda é a última linha lida inteira: o problema está na seguinte
+        except UnicodeDecodeError:
+            yield reader.line_num + 1, UnreadableFile("o arquivo não está em UTF-8")
+        except csv.Error as error:
+            yield reader.line_num + 1, UnreadableFile(f"CSV malformado ({error})")
+        return
+
+    line_number = 0
+    try:
+        for line_number, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("a linha não é um objeto JSON")
+            except ValueError as error:
+                yield line_number, error
+            else:
+                yield line_number, record
+    except UnicodeDecodeError:
+        yield line_number + 1, UnreadableFile("o arquivo não está em UTF-8")
+
+
+def validate(entity, record):
+    """Converte e valida um registro; levanta ValueError com a mensagem do erro."""
+    _, columns = ENTITIES[entity]
+    values = {}
+    for column, (parse, required) in columns.items():
+        raw = record.get(column)
+        if raw is None or str(raw).strip() == "":
+            if required:
+                raise ValueError(f"'{column}' é obrigatório")
+            continue
+        try:
+            values[column] = parse(raw)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"'{column}' inválido ({error})")
+    return values
+
+
+def _write_chunk(model, chunk, lines, result):
+    # Um INSERT executemany e um commit por lote; se o banco recusar o lote
+    # (constraint), ele inteiro é desfeito e reportado pela faixa de linhas
+    try:
+        db.session.execute(insert(model), chunk)
+        db.session.commit()
+    except IntegrityError as error:
+        db.session.rollback()
+        result.add_error(
+            f"{lines[0]}-{lines[-1]}", f"lote recusado pelo banco ({error.orig})", count=len(chunk)
+        )
+        return
+    result.inserted += len(chunk)
+
+
+def import_records(entity, stream, fmt, chunk_size=CHUNK_SIZE):
+    """Importa um arquivo CSV/JSONL; linhas inválidas são puladas e reportadas."""
+    model, _ = ENTITIES[entity]
+    result = ImportResult()
+    chunk, lines = [], []
+
+    for line_number, record in iter_records(stream, fmt):
+        if isinstance(record, UnreadableFile):
+            result.add_error(line_number, str(record))
+            result.stopped_at = line_number
+            break
+        if isinstance(record, Exception):
+            result.add_error(line_number, str(record))
+            continue
+        try:
+            chunk.append(validate(entity, record))
+            lines.append(line_number)
+        except ValueError as error:
+            result.add_error(line_number, str(error))
+            continue
+
+        if len(chunk) >= chunk_size:
+            _write_chunk(model, chunk, lines, result)
+            chunk, lines = [], []
+
+    if chunk:
+        _write_chunk(model, chunk, lines, result)
+    return result
+
+
+def _serialize(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def export_records(entity, fmt, batch_size=CHUNK_SIZE):
+    """Gera o arquivo de exportação em pedaços de texto (para Response em streaming)."""
+    model, columns = ENTITIES[entity]
+    names = ["id"] + list(columns)
+    statement = select(*(getattr(model, name) for name in names)).order_by(model.id)
+    rows = db.session.execute(statement.execution_options(yield_per=batch_size))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(names)
+
+    for row in rows:
+        values = [_serialize(value) for value in row]
+        if fmt == "csv":
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(names, values)), ensure_ascii=False) + "\n")
+        # Envia em blocos de ~64 KB sem acumular o arquivo em memória
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# ============================================
+# AÇÕES EM MASSA (UM STATEMENT POR LOTE)
+# ============================================
+
+def parse_ids(values):
+    """Converte os ids marcados no formulário (ignora valores inválidos)."""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    if len(ids) > BULK_MAX_IDS:
+        raise ValueError(f"selecione no máximo {BULK_MAX_IDS} registros por vez")
+    return sorted(ids)
+
+
+def bulk_delete(entity, ids):
+    """
+    DELETE ... WHERE id IN (...) RETURNING <imagem> em um único statement.
+    Retorna (quantidade apagada, arquivos que eram usados pelas linhas).
+    A limpeza dos arquivos fica para quem chamou (depois do commit).
+    """
+    model, _ = ENTITIES[entity]
+    returned = getattr(model, FILE_COLUMNS[entity]) if entity in FILE_COLUMNS else model.id
+    statement = (
+        delete(model)
+        .where(model.id.in_(ids))
+        .returning(returned)
+        .execution_options(synchronize_session=False)
+    )
+    values = db.session.scalars(statement).all()
+    db.session.commit()
+    files = sorted({value for value in values if value}) if entity in FILE_COLUMNS else []
+    return len(values), files
+
+
+def bulk_update(entity, ids, form):
+    """
+    UPDATE ... SET <campos preenchidos> WHERE id IN (...) em um único statement.
+    Campos vazios no formulário não são alterados. Retorna a quantidade alterada.
+    """
+    model, columns = ENTITIES[entity]
+    values = {}
+    for column in BULK_EDIT_FIELDS.get(entity, {}):
+        raw = form.get(column)
+        if raw is None or str(raw).strip() == "":
+            continue
+        parse, _ = columns[column]
+        try:
+            values[column] = parse(raw)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"'{column}' inválido ({error})")
+    if not values:
+        raise ValueError("preencha ao menos um campo para alterar")
+
+    statement = (
+        update(model)
+        .where(model.id.in_(ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(statement)
+    db.session.commit()
+    return result.rowcount
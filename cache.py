@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# ============================================
+# CACHE DE PÁGINAS VERSIONADO POR MODELO
+# ============================================
+# Cada modelo tem um "número de versão" guardado como o mtime de um arquivo
+# em instance/versions/<Modelo>. Assim todos os workers do gunicorn enxergam
+# a mesma versão com um simples os.stat(), sem tocar no SQLite.
+
+VERSION_DIR = None
+MAX_ENTRIES = 256
+DEFAULT_TTL = 300
+
+
+def init_cache(app):
+    """Configura a pasta de versões e registra os eventos de commit."""
+    global VERSION_DIR
+    VERSION_DIR = app.config.get(
+        "CACHE_VERSION_DIR",
+        os.path.join(app.instance_path, "versions")
+    )
+    os.makedirs(VERSION_DIR, exist_ok=True)
+
+
+def model_version(name):
+    """Retorna a versão atual de um modelo (0 se nunca foi alterado)."""
+    try:
+        return os.stat(os.path.join(VERSION_DIR, name)).st_mtime_ns
+    except (OSError, TypeError):
+        return 0
+
+
+def bump_version(*names):
+    """Invalida o cache de todos os modelos informados."""
+    if VERSION_DIR is None:
+        return
+    for name in names:
+        path = os.path.join(VERSION_DIR, name)
+        # Garante que a nova versão seja sempre maior que a anterior,
+        # mesmo que o relógio do sistema tenha baixa resolução.
+        now = max(time.time_ns(), model_version(name) + 1)
+        with open(path, "a"):
+            pass
+        os.utime(path, ns=(now, now))
+
+
+# Coleta os modelos alterados em cada flush e publica no commit
+@event.listens_for(Session, "after_flush")
+def _collect_changed_models(session, flush_context):
+    changed = session.info.setdefault("changed_models", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed.add(type(obj).__name__)
+
+
+# INSERT/UPDATE/DELETE em massa (session.execute) não passam pelo flush
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            changed = orm_execute_state.session.info.setdefault("changed_models", set())
+            changed.add(mapper.class_.__name__)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed_models(session):
+    changed = session.info.pop("changed_models", None)
+    if changed:
+        bump_version(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_models(session):
+    session.info.pop("changed_models", None)
+
+
+class PageCache:
+    """Cache LRU em memória (por processo) de respostas renderizadas."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+page_cache = PageCache()
+
+
+def cached_page(*models, version=None):
+    """
+    Decorador que guarda o HTML da rota para visitantes anônimos.
+    A entrada é descartada quando qualquer um dos modelos muda de versão
+    (ou quando muda o valor de version(), se informado).
+    Usuários logados sempre recebem a página renderizada (o header é pessoal).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if current_user.is_authenticated:
+                return f(*args, **kwargs)
+
+            key = (f.__name__, request.full_path)
+            current = tuple(model_version(name) for name in models)
+            if version is not None:
+                current += (version(),)
+            html = page_cache.get(key, current)
+            if html is None:
+                html = f(*args, **kwargs)
+                if isinstance(html, str):
+                    page_cache.set(key, current, html)
+            return html
+        return decorated_function
+    return decorator
+
+
+class CachedValue:
+    """
+    Resultado de uma função guardado em memória (por processo).
+    É recalculado quando passa de 'ttl' segundos, quando a versão de algum
+    dos modelos muda (commit em qualquer worker) ou após invalidate().
+    'ttl' também pode ser uma função que recebe o valor carregado e retorna
+    os segundos de validade (ex.: até o próximo horário em que ele muda).
+    """
+
+    def __init__(self, loader, models, ttl=DEFAULT_TTL):
+        self.loader = loader
+        self.models = models
+        self.ttl = ttl
+        self._entry = None  # (versão, expira_em, valor)
+        self._lock = threading.Lock()
+
+    def _version(self):
+        return tuple(model_version(name) for name in self.models)
+
+    def get(self):
+        version = self._version()
+        entry = self._entry
+        if entry is not None and entry[0] == version and time.monotonic() < entry[1]:
+            return entry[2]
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperávamos o lock
+            entry = self._entry
+            if entry is not None and entry[0] == version and time.monotonic() < entry[1]:
+                return entry[2]
+            value = self.loader()
+            ttl = self.ttl(value) if callable(self.ttl) else self.ttl
+            self._entry = (version, time.monotonic() + ttl, value)
+            return value
+
+    def invalidate(self):
+        """Descarta o valor deste processo e avisa os outros workers."""
+        self._entry = None
+        bump_version(*self.models)
+
+
+def cached_value(*models, ttl=DEFAULT_TTL):
+    """Decorador que transforma uma função sem argumentos em um CachedValue."""
+    def decorator(f):
+        return wraps(f)(CachedValue(f, models, ttl))
+    return decorator
+
+
+class CachedMapping:
+    """
+    Como CachedValue, mas com um valor por chave (loader(chave)), em LRU de
+    até 'max_entries' chaves. Resultados None não são guardados.
+    """
+
+    def __init__(self, loader, models, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES):
+        self.loader = loader
+        self.models = models
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # chave -> (versão, expira_em, valor)
+        self._lock = threading.Lock()
+
+    def _version(self):
+        return tuple(model_version(name) for name in self.models)
+
+    def get(self, key):
+        version = self._version()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == version and time.monotonic() < entry[1]:
+                self._data.move_to_end(key)
+                return entry[2]
+
+        value = self.loader(key)
+        if value is not None:
+            with self._lock:
+                self._data[key] = (version, time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+        return value
+
+    def invalidate(self, key=None):
+        """Descarta uma chave (ou todas) neste processo e avisa os outros workers."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+        bump_version(*self.models)
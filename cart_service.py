@@ -0,0 +1,105 @@
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, Cart, CartItem
+
+# ============================================
+# SERVIÇO DO CARRINHO (ESCRITAS ATÔMICAS)
+# ============================================
+# Cada operação é um único INSERT/UPDATE/DELETE dentro de uma transação.
+# O incremento acontece no próprio SQLite (quantity = quantity + 1), então
+# cliques simultâneos em workers diferentes não perdem atualizações.
+# Depende dos índices únicos de Cart.user_id e CartItem(cart_id, product_id).
+
+
+def _cart_id_of(user_id):
+    """Subconsulta com o id do carrinho do usuário."""
+    return select(Cart.id).where(Cart.user_id == user_id).scalar_subquery()
+
+
+def ensure_cart(user_id):
+    """Cria o carrinho do usuário se ainda não existir (sem commit)."""
+    db.session.execute(
+        insert(Cart)
+        .values(user_id=user_id)
+        .on_conflict_do_nothing(index_elements=[Cart.user_id])
+    )
+
+
+def add_item(user_id, product_id, quantity=1):
+    """Soma 'quantity' unidades do produto ao carrinho em uma transação."""
+    ensure_cart(user_id)
+    db.session.execute(
+        insert(CartItem)
+        .values(cart_id=_cart_id_of(user_id), product_id=product_id, quantity=quantity)
+        .on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id],
+            set_={"quantity": CartItem.quantity + quantity}
+        )
+    )
+    db.session.commit()
+
+
+def set_quantity(user_id, product_id, quantity):
+    """
+    Define a quantidade de um item; quantidade <= 0 remove o item.
+    Retorna o número de linhas afetadas (0 se o item não estava no carrinho).
+    """
+    if quantity <= 0:
+        return remove_item(user_id, product_id)
+
+    result = db.session.execute(
+        update(CartItem)
+        .where(CartItem.cart_id == _cart_id_of(user_id), CartItem.product_id == product_id)
+        .values(quantity=quantity)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def remove_item(user_id, product_id):
+    """Remove um item do carrinho; retorna o número de linhas removidas."""
+    result = db.session.execute(
+        delete(CartItem)
+        .where(CartItem.cart_id == _cart_id_of(user_id), CartItem.product_id == product_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def get_items(user_id):
+    """Retorna {product_id: quantidade} do carrinho salvo no banco."""
+    rows = db.session.execute(
+        select(CartItem.product_id, CartItem.quantity)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(Cart.user_id == user_id)
+    ).all()
+    return {product_id: quantity for product_id, quantity in rows}
+
+
+def replace_items(user_id, items):
+    """
+    Substitui o conteúdo do carrinho no banco por 'items' ({product_id: qtd})
+    em uma única transação: um DELETE dos itens que saíram e um upsert em lote.
+    """
+    ensure_cart(user_id)
+    cart_id = db.session.execute(select(Cart.id).where(Cart.user_id == user_id)).scalar_one()
+
+    db.session.execute(
+        delete(CartItem)
+        .where(CartItem.cart_id == cart_id, CartItem.product_id.not_in(list(items)))
+        .execution_options(synchronize_session=False)
+    )
+    if items:
+        stmt = insert(CartItem)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id],
+            set_={"quantity": stmt.excluded.quantity}
+        )
+        db.session.execute(stmt, [
+            {"cart_id": cart_id, "product_id": product_id, "quantity": quantity}
+            for product_id, quantity in items.items()
+        ])
+    db.session.commit()
@@ -0,0 +1,128 @@
+import datetime
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Cart, CartItem, Order, OrderLine, Product
+import cart_service
+
+# ============================================
+# CHECKOUT TRANSACIONAL
+# ============================================
+# O pedido inteiro é uma única transação: trava o carrinho, tira a "foto"
+# dos preços com um SELECT com JOIN, insere o Order e esvazia o carrinho com
+# um único DELETE. Cada item também vira uma OrderLine (usada no histórico
+# e nos relatórios de vendas). Um re-envio do formulário com a mesma idempotency_key
+# devolve o pedido já criado em vez de gerar outro.
+
+
+def find_order(user_id, idempotency_key):
+    """Pedido já criado com esta chave (ou None)."""
+    if not idempotency_key:
+        return None
+    return Order.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+
+
+def snapshot_items(cart_id):
+    """Itens do carrinho com nome e preço atuais, em uma consulta."""
+    return db.session.execute(
+        select(Product.id, Product.name, Product.price, CartItem.quantity)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id == cart_id)
+        .order_by(CartItem.id)
+    ).all()
+
+
+def place_order(user_id, details, idempotency_key=None, discount_rate=0.0):
+    """
+    Cria o pedido a partir do carrinho do usuário e esvazia o carrinho.
+    'details' traz name, email, address, city, zip_code e payment_method.
+    Retorna (pedido, criado); pedido é None se o carrinho estiver vazio e
+    criado é False quando a chave de idempotência já tinha um pedido.
+    """
+    # O primeiro comando é uma escrita: o SQLite pega o lock de escrita já
+    # aqui, então nenhum outro worker altera o carrinho entre a foto e o DELETE.
+    cart_service.ensure_cart(user_id)
+    cart_id = db.session.execute(select(Cart.id).where(Cart.user_id == user_id)).scalar_one()
+
+    rows = snapshot_items(cart_id)
+    if not rows:
+        db.session.rollback()
+        return find_order(user_id, idempotency_key), False
+
+    items = [{'name': row.name, 'quantity': row.quantity, 'price': row.price} for row in rows]
+    subtotal = sum(float(row.price) * row.quantity for row in rows)
+
+    created_at = datetime.datetime.utcnow()
+    order = Order(
+        user_id=user_id,
+        total=subtotal - subtotal * discount_rate,
+        items=items,
+        idempotency_key=idempotency_key or None,
+        created_at=created_at,
+        lines=[
+            OrderLine(product_id=row.id, name=row.name, unit_price=row.price,
+                      quantity=row.quantity, created_at=created_at)
+            for row in rows
+        ],
+        **details
+    )
+    db.session.add(order)
+    try:
+        # O INSERT do pedido vai no autoflush deste DELETE: a violação pode vir daqui
+        db.session.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id == cart_id)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # Só a corrida em ux_order_user_idempotency (outro envio com a mesma
+        # chave ganhou) é tratada; qualquer outra violação sobe
+        existing = find_order(user_id, idempotency_key)
+        if existing is None:
+            raise
+        return existing, False
+    return order, True
+
+
+def backfill_order_lines(batch_size=1000):
+    """
+    Gera as OrderLine dos pedidos antigos a partir do JSON de Order.items
+    (o produto é encontrado pelo nome, se ainda existir). Processa os pedidos
+    em lotes de 'batch_size' com um commit por lote; retorna quantas linhas
+    foram criadas.
+    """
+    product_ids = dict(db.session.execute(select(Product.name, Product.id)).all())
+    has_lines = select(OrderLine.id).where(OrderLine.order_id == Order.id).exists()
+
+    created = 0
+    last_id = 0
+    while True:
+        orders = db.session.execute(
+            select(Order.id, Order.items, Order.created_at)
+            .where(Order.id > last_id, ~has_lines)
+            .order_by(Order.id)
+            .limit(batch_size)
+        ).all()
+        if not orders:
+            break
+        last_id = orders[-1].id
+
+        lines = [
+            {
+                "order_id": order.id,
+                "product_id": product_ids.get(item.get("name")),
+                "name": item.get("name") or "",
+                "unit_price": float(item.get("price") or 0),
+                "quantity": int(item.get("quantity") or 0),
+                "created_at": order.created_at or datetime.datetime.utcnow(),
+            }
+            for order in orders for item in order.items or []
+        ]
+        if lines:
+            db.session.execute(insert(OrderLine), lines)
+            created += len(lines)
+        db.session.commit()
+    return created
@@ -0,0 +1,93 @@
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# ============================================
+# PERFIL DO SQLITE (PRAGMAS + POOL + RÉPLICA)
+# ============================================
+# Os PRAGMAs valem por conexão, então são aplicados no evento "connect"
+# de cada engine. Em modo WAL leitores não bloqueiam o escritor (e vice-versa),
+# o que elimina a maior parte dos "database is locked" sob o gunicorn.
+
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",       # seguro em WAL; fsync só nos checkpoints
+    "busy_timeout": 5000,          # ms esperando o lock antes de falhar
+    "cache_size": -64000,          # negativo = KiB (64 MB por conexão)
+    "mmap_size": 268435456,        # 256 MB lidos via mmap
+    "temp_store": "MEMORY",
+}
+
+DEFAULT_ENGINE_OPTIONS = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+}
+
+REPLICA_BIND = "replica"
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Registra os PRAGMAs para toda nova conexão SQLite do engine."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def configure_database(app, replica_uri=None):
+    """
+    Preenche as opções de engine do Flask-SQLAlchemy (chamar antes de db.init_app).
+    Se houver uma URI de réplica, ela vira o bind "replica" usado por read_replica.
+    """
+    app.config.setdefault("SQLITE_PRAGMAS", dict(DEFAULT_SQLITE_PRAGMAS))
+    # SQLite em memória usa StaticPool, que não aceita opções de pool
+    if make_url(app.config["SQLALCHEMY_DATABASE_URI"]).database not in (None, "", ":memory:"):
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", dict(DEFAULT_ENGINE_OPTIONS))
+    if replica_uri:
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        binds[REPLICA_BIND] = replica_uri
+
+
+def init_database_profile(app, db):
+    """Aplica os PRAGMAs em todos os engines (chamar depois de db.init_app)."""
+    pragmas = app.config["SQLITE_PRAGMAS"]
+    # A réplica é só leitura: não pode trocar o journal_mode do arquivo
+    replica_pragmas = {name: value for name, value in pragmas.items() if name != "journal_mode"}
+    with app.app_context():
+        for key, engine in db.engines.items():
+            apply_sqlite_pragmas(engine, replica_pragmas if key == REPLICA_BIND else pragmas)
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia as leituras das rotas marcadas com @read_replica para o
+    bind "replica". Escritas (flush) continuam sempre no banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and g.get("read_replica")
+            and REPLICA_BIND in self._db.engines
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    """Marca uma rota pública (somente leitura) para ler da réplica, se houver."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,185 @@
+import datetime
+import json
+
+from sqlalchemy import func, select, text
+
+from models import db, DeletedMatch, Match
+
+# ============================================
+# FEEDS DA AGENDA (ICALENDAR / JSON)
+# ============================================
+# /agenda.ics e /api/matches são gerados a partir de Match e guardados em
+# memória até o próximo commit em Match (a versão do modelo, a mesma do
+# cache de páginas, também é o ETag/Last-Modified das respostas).
+#
+# Para a sincronização incremental cada partida tem updated_at e as
+# partidas apagadas deixam uma linha em deleted_match (trigger no SQLite,
+# como a busca e as estatísticas: vale também para o delete em massa).
+# Os dois horários são do SQLite, no momento da escrita, com resolução de
+# milissegundos: o delta usa >= since, então uma mudança no mesmo
+# milissegundo do next_since anterior volta de novo em vez de se perder.
+# Todos os horários dos feeds saem em UTC com fuso explícito.
+
+MATCH_DURATION = datetime.timedelta(hours=2)  # duração usada no DTEND do .ics
+CALENDAR_NAME = "RoyaleHub Esports - Agenda"
+ICS_LINE_LIMIT = 75  # octetos por linha (RFC 5545), o resto é dobrado
+
+# O id pode voltar a ser usado pelo SQLite: uma partida nova apaga a lápide
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS feeds_match_delete AFTER DELETE ON match BEGIN
+        INSERT INTO deleted_match (id, deleted_at)
+        VALUES (old.id, strftime('%Y-%m-%d %H:%M:%f', 'now') || '000')
+        ON CONFLICT (id) DO UPDATE SET deleted_at = excluded.deleted_at;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS feeds_match_insert AFTER INSERT ON match BEGIN
+        DELETE FROM deleted_match WHERE id = new.id;
+    END
+    """,
+]
+
+
+def init_feeds(engine):
+    """Cria as triggers das partidas apagadas (só SQLite)."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        for statement in TRIGGERS:
+            connection.execute(text(statement))
+
+
+def _to_utc(starts_at, timezone):
+    """starts_at (horário local sem tzinfo) -> datetime em UTC com tzinfo."""
+    return starts_at.replace(tzinfo=timezone).astimezone(datetime.timezone.utc)
+
+
+def _isoformat_utc(value):
+    """Datetime em UTC -> '2025-03-10T21:00:00.000000Z' (vai direto na URL do ?since=)."""
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ") if value else None
+
+
+def parse_since(value):
+    """?since= (ISO 8601) -> datetime UTC sem tzinfo; levanta ValueError se inválido."""
+    since = datetime.datetime.fromisoformat(value.strip())
+    if since.tzinfo is not None:
+        since = since.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return since
+
+
+# ============================================
+# JSON
+# ============================================
+
+def match_json(match, timezone):
+    return {
+        "id": match.id,
+        "tournament": match.tournament,
+        "opponent": match.opponent,
+        "starts_at": _isoformat_utc(_to_utc(match.starts_at, timezone)),
+        "updated_at": _isoformat_utc(match.updated_at),
+    }
+
+
+def _matches_statement():
+    return select(Match).order_by(Match.starts_at, Match.id)
+
+
+def _last_change(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def render_json(timezone):
+    """Feed completo: todas as partidas e o 'next_since' para as próximas chamadas."""
+    matches = db.session.scalars(_matches_statement()).all()
+    last_deleted = db.session.scalar(select(func.max(DeletedMatch.deleted_at)))
+    last_change = _last_change(last_deleted, *(match.updated_at for match in matches))
+    body = {
+        "matches": [match_json(match, timezone) for match in matches],
+        "deleted": [],
+        "next_since": _isoformat_utc(last_change),
+    }
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+def changes_since(since, timezone):
+    """
+    O que mudou a partir de 'since' (usa ix_match_updated_at e o índice de
+    deleted_at). 'next_since' é o horário da última mudança devolvida.
+    """
+    matches = db.session.scalars(_matches_statement().where(Match.updated_at >= since)).all()
+    deleted = db.session.execute(
+        select(DeletedMatch.id, DeletedMatch.deleted_at).where(DeletedMatch.deleted_at >= since)
+    ).all()
+    last_change = _last_change(
+        since, *(match.updated_at for match in matches), *(row.deleted_at for row in deleted)
+    )
+    return {
+        "matches": [match_json(match, timezone) for match in matches],
+        "deleted": [row.id for row in deleted],
+        "next_since": _isoformat_utc(last_change),
+    }
+
+
+# ============================================
+# ICALENDAR (RFC 5545)
+# ============================================
+
+def _escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Quebra linhas com mais de 75 octetos (continuação começa com espaço)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICS_LINE_LIMIT:
+        return line
+    parts, current = [], ""
+    for char in line:
+        limit = ICS_LINE_LIMIT if not parts else ICS_LINE_LIMIT - 1
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = ""
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def _ics_time(value):
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_ics(timezone, agenda_url, domain):
+    """Calendário com todas as partidas (horários em UTC)."""
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//RoyaleHub Esports//Agenda//PT-BR",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(CALENDAR_NAME)}",
+    ]
+    epoch = datetime.datetime(1970, 1, 1)
+    for match in db.session.scalars(_matches_statement()):
+        starts_at = _to_utc(match.starts_at, timezone)
+        # DTSTAMP fixo por versão da partida: o arquivo só muda quando algo muda
+        stamp = (match.updated_at or epoch).replace(tzinfo=datetime.timezone.utc)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:match-{match.id}@{domain}",
+            f"DTSTAMP:{_ics_time(stamp)}",
+            f"LAST-MODIFIED:{_ics_time(stamp)}",
+            f"DTSTART:{_ics_time(starts_at)}",
+            f"DTEND:{_ics_time(starts_at + MATCH_DURATION)}",
+            f"SUMMARY:{_escape(f'RoyaleHub x {match.opponent}')}",
+            f"DESCRIPTION:{_escape(match.tournament)}",
+            f"URL:{agenda_url}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode("utf-8")
@@ -0,0 +1,150 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow é opcional: sem ele as páginas usam só o original
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# VERSÕES REDIMENSIONADAS DAS IMAGENS
+# ============================================
+# Depois do upload, um pool de threads gera versões menores do arquivo
+# (thumb/card/hero) em WebP/AVIF e no formato original, salvas ao lado dele:
+#   static/uploads/news/abc123.jpg -> abc123-card.webp, abc123-card.jpg, ...
+# O request do admin não espera o processamento.
+
+RENDITIONS = {
+    "thumb": 320,
+    "card": 640,
+    "hero": 1280,
+}
+QUALITY = {"webp": 80, "avif": 60, "jpeg": 82}
+RESIZABLE_EXTENSIONS = {"jpg", "jpeg", "png"}  # GIF animado fica como está
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="images")
+
+
+def modern_formats():
+    """Formatos extras suportados pelo Pillow instalado, do mais leve ao mais pesado."""
+    if Image is None:
+        return []
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def rendition_path(path, name, ext):
+    stem, _ = os.path.splitext(path)
+    return f"{stem}-{name}.{ext}"
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower().lstrip(".")
+
+
+def generate_renditions(path):
+    """Gera todas as versões de um arquivo (síncrono; roda no pool de threads)."""
+    ext = _extension(path)
+    if Image is None or ext not in RESIZABLE_EXTENSIONS:
+        return []
+
+    created = []
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original)
+        for name, width in RENDITIONS.items():
+            # Nunca aumenta a imagem (o srcset anuncia a largura da versão)
+            if width > original.width:
+                continue
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height), Image.LANCZOS)
+
+            for fmt in modern_formats() + [ext]:
+                target = rendition_path(path, name, fmt)
+                image = resized
+                if fmt in ("jpg", "jpeg") and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                save_format = "JPEG" if fmt in ("jpg", "jpeg") else fmt.upper()
+                options = {"quality": QUALITY.get(fmt, QUALITY["jpeg"])} if fmt != "png" else {"optimize": True}
+                # Grava em arquivo temporário para nunca servir uma imagem pela metade
+                tmp = target + ".tmp"
+                image.save(tmp, format=save_format, **options)
+                os.replace(tmp, target)
+                created.append(target)
+    return created
+
+
+def _generate_safely(path):
+    try:
+        return generate_renditions(path)
+    except Exception:
+        logger.exception("Falha ao gerar versões de %s", path)
+        return []
+
+
+def schedule_renditions(path):
+    """Agenda a geração das versões em segundo plano."""
+    if Image is None or _extension(path) not in RESIZABLE_EXTENSIONS:
+        return None
+    return _executor.submit(_generate_safely, path)
+
+
+def run_in_background(function, *args):
+    """Executa outra tarefa de arquivos no mesmo pool (erros vão para o log)."""
+    def run():
+        try:
+            return function(*args)
+        except Exception:
+            logger.exception("Falha na tarefa em segundo plano %s", function.__name__)
+    return _executor.submit(run)
+
+
+def delete_renditions(path):
+    """Remove as versões geradas de um arquivo."""
+    for name in RENDITIONS:
+        for fmt in set(modern_formats() + [_extension(path), "webp", "avif"]):
+            target = rendition_path(path, name, fmt)
+            if os.path.exists(target):
+                os.remove(target)
+
+
+def _srcset(static_dir, subdirectory, filename, fmt):
+    """Monta o srcset com as versões que já existem em disco."""
+    entries = []
+    for name, width in RENDITIONS.items():
+        rendition = os.path.basename(rendition_path(filename, name, fmt))
+        if os.path.exists(os.path.join(static_dir, "uploads", subdirectory, rendition)):
+            url = url_for("static", filename=f"uploads/{subdirectory}/{rendition}")
+            entries.append(f"{url} {width}w")
+    return ", ".join(entries)
+
+
+def responsive_image(static_dir, subdirectory, filename, alt="", sizes="100vw", **attrs):
+    """
+    HTML de um <picture> com srcset em AVIF/WebP e no formato original.
+    Enquanto as versões não existem, cai para um <img> simples do original.
+    """
+    src = url_for("static", filename=f"uploads/{subdirectory}/{filename}")
+    attributes = "".join(
+        f' {key.rstrip("_").replace("_", "-")}="{escape(value)}"' for key, value in attrs.items()
+    )
+
+    sources = []
+    for fmt in modern_formats():
+        srcset = _srcset(static_dir, subdirectory, filename, fmt)
+        if srcset:
+            sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{escape(sizes)}">')
+    fallback_srcset = _srcset(static_dir, subdirectory, filename, _extension(filename))
+
+    img = f'<img src="{src}" alt="{escape(alt)}" loading="lazy" decoding="async"{attributes}'
+    if fallback_srcset:
+        img += f' srcset="{fallback_srcset}" sizes="{escape(sizes)}"'
+    img += ">"
+
+    if not sources:
+        return Markup(img)
+    return Markup(f'<picture class="contents">{"".join(sources)}{img}</picture>')
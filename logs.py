@@ -0,0 +1,198 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+import zlib
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+# ============================================
+# LOGS ESTRUTURADOS (JSON) SEM BLOQUEAR AS REQUISIÇÕES
+# ============================================
+# Quem loga só coloca o registro numa fila em memória (QueueHandler); uma
+# thread por worker (QueueListener) formata em JSON e escreve no stdout.
+# Se a saída ficar lenta e a fila encher, os registros novos são
+# descartados (e contados: log_records_dropped_total no /metrics) em vez
+# de segurar a requisição: um checkout nunca espera pelo log.
+#
+# Cada linha leva o request_id (X-Request-ID recebido ou gerado), o
+# user_id e, quando informado em extra=, o order_id. Rotas muito chamadas
+# podem ter amostragem por nível (LOG_SAMPLING); WARNING ou acima sempre
+# passam. A decisão é por requisição: ou todas as linhas dela saem, ou
+# nenhuma.
+
+QUEUE_SIZE = 10_000
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# Campos copiados do registro para o JSON (contexto da requisição ou extra=)
+FIELDS = (
+    "request_id", "user_id", "order_id", "product_id", "quantity",
+    "endpoint", "method", "path", "status", "duration_ms",
+)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (e conta) registros quando a fila está cheia."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Só resolve a mensagem aqui; o JSON é montado na thread do listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class RequestContextFilter(logging.Filter):
+    """Copia request_id/user_id/endpoint para o registro (na thread da requisição)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id")
+            record.endpoint = request.endpoint
+            record.method = request.method
+            record.path = request.path
+            # Só usa o usuário se o Flask-Login já o carregou (sem consulta extra)
+            user = g.get("_login_user")
+            if user is not None and getattr(user, "is_authenticated", False):
+                record.user_id = user.id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Amostragem por endpoint e nível: {"api_cart": {"INFO": 0.01}} mantém 1%
+    das requisições do api_cart no nível INFO (e abaixo dele, se não houver
+    taxa própria). WARNING ou acima nunca são descartados.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {
+            endpoint: {logging.getLevelName(level): rate for level, rate in levels.items()}
+            for endpoint, levels in rates.items()
+        }
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not has_request_context():
+            return True
+        levels = self.rates.get(request.endpoint)
+        if not levels:
+            return True
+        rate = next((levels[level] for level in sorted(levels) if record.levelno <= level), 1.0)
+        if rate >= 1.0:
+            return True
+        # Mesmo request_id -> mesma decisão para todas as linhas da requisição
+        bucket = zlib.crc32(str(g.get("request_id")).encode()) % 10_000
+        return bucket < rate * 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_pipeline = {"handler": None, "listener": None}
+
+
+def _start_listener():
+    handler = _pipeline["handler"]
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    listener.start()
+    _pipeline["listener"] = listener
+
+
+def _restart_after_fork():
+    # A thread do listener não sobrevive ao fork (gunicorn --preload):
+    # cada worker começa com uma fila vazia e a própria thread
+    if _pipeline["handler"] is not None:
+        _pipeline["handler"].queue = queue.Queue(maxsize=_pipeline["handler"].queue.maxsize)
+        _pipeline["handler"].dropped = 0  # o contador é por processo, como as métricas
+        _start_listener()
+
+
+def _stop_listener():
+    if _pipeline["listener"] is not None:
+        _pipeline["listener"].stop()  # escreve o que ainda está na fila
+
+
+def dropped_records():
+    """Registros descartados neste processo (log_records_dropped_total no /metrics)."""
+    handler = _pipeline["handler"]
+    return handler.dropped if handler else 0
+
+
+def init_logging(app):
+    """Troca os handlers do root logger pela fila + listener e registra o request_id."""
+    app.config.setdefault("LOG_LEVEL", "INFO")
+    app.config.setdefault("LOG_QUEUE_SIZE", QUEUE_SIZE)
+    app.config.setdefault("LOG_SAMPLING", {})
+
+    if _pipeline["handler"] is None:
+        handler = DroppingQueueHandler(queue.Queue(maxsize=app.config["LOG_QUEUE_SIZE"]))
+        handler.addFilter(RequestContextFilter())
+        handler.addFilter(SamplingFilter(app.config["LOG_SAMPLING"]))
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(app.config["LOG_LEVEL"])
+        _pipeline["handler"] = handler
+        _start_listener()
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_restart_after_fork)
+
+    # O app.logger do Flask passa a subir para o root (sem o handler padrão)
+    app.logger.removeHandler(default_handler)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_started = time.perf_counter()
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def log_request(response):
+        response.headers[REQUEST_ID_HEADER] = g.get("request_id", "")
+        if "request_started" in g:
+            app.logger.info(
+                "%s %s %s", request.method, request.path, response.status_code,
+                extra={
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - g.request_started) * 1000, 2),
+                },
+            )
+        return response
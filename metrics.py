@@ -0,0 +1,331 @@
+import bisect
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ============================================
+# MÉTRICAS (FORMATO PROMETHEUS EM /metrics)
+# ============================================
+# Cada worker acumula em memória a latência por endpoint, quantas queries e
+# quanto tempo de SQL cada requisição gastou e o tempo de render de cada
+# template. Uma thread por worker grava o acumulado em
+# instance/metrics/<pid>-<início>.json a cada FLUSH_INTERVAL segundos (fora do
+# caminho da requisição) e /metrics soma os arquivos de todos os workers,
+# como a versão dos modelos do cache.py, que também é compartilhada por
+# arquivo. Arquivos de workers que já morreram são somados em
+# ACCUMULATED_FILE e apagados: os contadores nunca diminuem e a pasta não
+# cresce a cada worker reciclado ou deploy.
+#
+# Requisições com mais queries que QUERY_ALARM (ou que o limite do endpoint
+# em METRICS_QUERY_BUDGETS) incrementam db_query_alarms_total e geram um
+# aviso no log: é assim que um N+1 novo aparece.
+
+FLUSH_INTERVAL = 5.0
+ACCUMULATED_FILE = "acumulado.json"  # soma dos workers que já morreram
+QUERY_ALARM = 20
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# nome -> (tipo, ajuda, buckets)
+METRICS = {
+    "http_requests_total": ("counter", "Requisições por endpoint, método e status.", None),
+    "http_request_duration_seconds": ("histogram", "Latência das requisições.", LATENCY_BUCKETS),
+    "db_queries_per_request": ("histogram", "Queries SQL por requisição.", QUERY_COUNT_BUCKETS),
+    "db_query_duration_seconds_total": ("counter", "Tempo total gasto em SQL.", None),
+    "db_query_alarms_total": ("counter", "Requisições acima do limite de queries (possível N+1).", None),
+    "template_render_seconds": ("histogram", "Tempo de render dos templates.", LATENCY_BUCKETS),
+    "log_records_dropped_total": ("counter", "Registros de log descartados com a fila cheia.", None),
+}
+
+
+class Registry:
+    """Contadores e histogramas deste processo: (nome, rótulos) -> valor."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}  # -> [contagem por bucket..., +Inf, soma]
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, labels, value):
+        """Para contadores mantidos fora do registro (ver register_source)."""
+        with self._lock:
+            self.counters[(name, labels)] = value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            entry[bisect.bisect_left(buckets, value)] += 1
+            entry[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, list(labels), list(entry)] for (name, labels), entry in self.histograms.items()],
+            }
+
+
+registry = Registry()
+_state = {"directory": None, "path": None, "thread": None}
+_sources = {}  # contador -> função que devolve o total deste processo
+
+
+def register_source(name, function):
+    """Contador lido de outro módulo a cada flush (ex.: logs.dropped_records)."""
+    _sources[name] = function
+
+
+# ============================================
+# COLETA (REQUISIÇÃO, SQL E TEMPLATES)
+# ============================================
+
+def _request_stats():
+    return getattr(g, "_metrics", None) if has_request_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = _request_stats()
+    if stats is not None:
+        stats["queries"] += 1
+        stats["query_time"] += elapsed
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None:
+        stats["templates"].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None and stats["templates"]:
+        elapsed = time.perf_counter() - stats["templates"].pop()
+        registry.observe("template_render_seconds", (("template", template.name or "<string>"),), elapsed)
+
+
+def _start_request():
+    g._metrics = {"start": time.perf_counter(), "queries": 0, "query_time": 0.0, "templates": []}
+
+
+def _finish_request(app, response):
+    stats = _request_stats()
+    if stats is None:
+        return response
+    endpoint = request.endpoint or "<sem rota>"
+    labels = (("endpoint", endpoint), ("method", request.method))
+    registry.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+    registry.observe("http_request_duration_seconds", labels, time.perf_counter() - stats["start"])
+    registry.observe("db_queries_per_request", (("endpoint", endpoint),), stats["queries"])
+    registry.inc("db_query_duration_seconds_total", (("endpoint", endpoint),), stats["query_time"])
+
+    budget = app.config["METRICS_QUERY_BUDGETS"].get(endpoint, app.config["METRICS_QUERY_ALARM"])
+    if stats["queries"] > budget:
+        registry.inc("db_query_alarms_total", (("endpoint", endpoint),))
+        app.logger.warning(
+            "%s %s fez %d queries (limite %d): possível N+1",
+            request.method, request.path, stats["queries"], budget,
+        )
+    _ensure_flusher()
+    return response
+
+
+# ============================================
+# ARQUIVOS POR WORKER
+# ============================================
+
+def flush():
+    """Grava o acumulado deste processo (troca atômica do arquivo)."""
+    if _state["directory"] is None:
+        return
+    if _state["path"] is None:
+        _state["path"] = os.path.join(_state["directory"], f"{os.getpid()}-{time.time_ns()}.json")
+    for name, function in _sources.items():
+        registry.set(name, (), function())
+    descriptor, tmp_path = tempfile.mkstemp(dir=_state["directory"], suffix=".tmp")
+    with os.fdopen(descriptor, "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp_path, _state["path"])
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _ensure_flusher():
+    # A thread nasce na primeira requisição: com 'gunicorn --preload' ela
+    # precisa existir no worker, não no processo mestre
+    if _state["thread"] is None:
+        thread = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+        _state["thread"] = thread
+        thread.start()
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(counters, histograms, data):
+    for name, labels, value in data["counters"]:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, entry in data["histograms"]:
+        key = (name, tuple(map(tuple, labels)))
+        total = histograms.setdefault(key, [0] * len(entry))
+        for index, value in enumerate(entry):
+            total[index] += value
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dead_worker_files():
+    """Arquivos de workers que não existem mais (pid morto ou reaproveitado)."""
+    by_pid = {}
+    for path in glob.glob(os.path.join(_state["directory"], "*-*.json")):
+        pid, _, started = os.path.basename(path)[:-len(".json")].partition("-")
+        if pid.isdigit() and started.isdigit():
+            by_pid.setdefault(int(pid), []).append((int(started), path))
+    dead = []
+    for pid, files in by_pid.items():
+        *older, (_, newest) = sorted(files)
+        dead += [path for _, path in older]  # o pid foi reaproveitado por outro worker
+        if newest != _state["path"] and not _alive(pid):
+            dead.append(newest)
+    return dead
+
+
+def _compact():
+    """Soma os arquivos de workers mortos no ACCUMULATED_FILE e apaga os originais."""
+    dead = _dead_worker_files()
+    if not dead:
+        return
+    accumulated_path = os.path.join(_state["directory"], ACCUMULATED_FILE)
+    counters, histograms = {}, {}
+    for path in [accumulated_path] + dead:
+        data = _read(path)
+        if data is not None:
+            _add(counters, histograms, data)
+    snapshot = {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), entry] for (name, labels), entry in histograms.items()],
+    }
+    descriptor, tmp_path = tempfile.mkstemp(dir=_state["directory"], suffix=".tmp")
+    with os.fdopen(descriptor, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, accumulated_path)
+    for path in dead:
+        os.remove(path)
+
+
+def collect():
+    """Soma os arquivos de todos os workers: (contadores, histogramas)."""
+    counters, histograms = {}, {}
+    with open(os.path.join(_state["directory"], ".lock"), "w") as lock:
+        # Um /metrics por vez: um arquivo nunca é lido no meio da compactação
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _compact()
+        for path in glob.glob(os.path.join(_state["directory"], "*.json")):
+            data = _read(path)
+            if data is not None:
+                _add(counters, histograms, data)
+    return counters, histograms
+
+
+# ============================================
+# FORMATO DE TEXTO DO PROMETHEUS
+# ============================================
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}" if labels else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Texto de exposição do Prometheus com as métricas de todos os workers."""
+    flush()
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            continue
+        for (metric, labels), entry in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], entry[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(float(entry[-1]))}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """Registra os hooks de requisição/template e a pasta dos arquivos por worker."""
+    app.config.setdefault("METRICS_QUERY_ALARM", QUERY_ALARM)
+    app.config.setdefault("METRICS_QUERY_BUDGETS", {})
+    _state["directory"] = app.config.get("METRICS_DIR", os.path.join(app.instance_path, "metrics"))
+    os.makedirs(_state["directory"], exist_ok=True)
+
+    @app.after_request
+    def record_request(response):
+        return _finish_request(app, response)
+
+    app.before_request(_start_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
@@ -0,0 +1,113 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from models import db
+
+# ============================================
+# MIGRAÇÃO LEVE (COLUNAS E ÍNDICES)
+# ============================================
+# db.create_all() só cria tabelas novas: um instance/site.db antigo continua
+# sem as colunas e índices novos de models.py. upgrade_database() compara os
+# índices (e colunas) declarados com os existentes e cria apenas os que
+# faltam, sem db.drop_all() e sem perder dados.
+
+# Antes de criar um índice único é preciso remover as duplicatas antigas
+DEDUPLICATE = {
+    "ix_cart_user_id": [
+        # Move os itens dos carrinhos repetidos para o carrinho mais antigo
+        """
+        UPDATE cart_item SET cart_id = (
+            SELECT MIN(keep.id) FROM cart AS keep
+            WHERE keep.user_id = (SELECT c.user_id FROM cart AS c WHERE c.id = cart_item.cart_id)
+        )
+        WHERE cart_id IN (
+            SELECT id FROM cart WHERE user_id IS NOT NULL
+            AND id NOT IN (SELECT MIN(id) FROM cart WHERE user_id IS NOT NULL GROUP BY user_id)
+        )
+        """,
+        """
+        DELETE FROM cart WHERE user_id IS NOT NULL
+        AND id NOT IN (SELECT MIN(id) FROM cart WHERE user_id IS NOT NULL GROUP BY user_id)
+        """,
+    ],
+    "ux_cart_item_cart_product": [
+        # Soma as quantidades das linhas repetidas na linha mais antiga
+        """
+        UPDATE cart_item SET quantity = (
+            SELECT SUM(dup.quantity) FROM cart_item AS dup
+            WHERE dup.cart_id = cart_item.cart_id AND dup.product_id = cart_item.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart_item
+            WHERE cart_id IS NOT NULL AND product_id IS NOT NULL
+            GROUP BY cart_id, product_id HAVING COUNT(*) > 1
+        )
+        """,
+        """
+        DELETE FROM cart_item WHERE cart_id IS NOT NULL AND product_id IS NOT NULL
+        AND id NOT IN (
+            SELECT MIN(id) FROM cart_item
+            WHERE cart_id IS NOT NULL AND product_id IS NOT NULL
+            GROUP BY cart_id, product_id
+        )
+        """,
+    ],
+}
+
+
+def missing_columns(connection, metadata=None):
+    """Lista (tabela, coluna) declaradas nos modelos que ainda não existem no banco."""
+    metadata = metadata or db.metadata
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend((table, column) for column in table.columns if column.name not in existing)
+    return missing
+
+
+def add_column(connection, table, column):
+    """ALTER TABLE ... ADD COLUMN (o SQLite só aceita colunas que podem ficar NULL ou com default)."""
+    if not column.nullable and column.server_default is None:
+        raise RuntimeError(
+            f"A coluna {table.name}.{column.name} é NOT NULL sem server_default "
+            "e não pode ser adicionada a uma tabela existente."
+        )
+    table_name = connection.dialect.identifier_preparer.format_table(table)
+    column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+
+
+def missing_indexes(connection, metadata=None):
+    """Lista os índices declarados nos modelos que ainda não existem no banco."""
+    metadata = metadata or db.metadata
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def upgrade_database(engine, metadata=None):
+    """Cria as colunas e os índices que faltam; retorna os nomes criados."""
+    created = []
+    with engine.begin() as connection:
+        for table, column in missing_columns(connection, metadata):
+            add_column(connection, table, column)
+            created.append(f"{table.name}.{column.name}")
+
+        for index in missing_indexes(connection, metadata):
+            for statement in DEDUPLICATE.get(index.name, []):
+                connection.execute(text(statement))
+            index.create(connection)
+            created.append(index.name)
+    return created
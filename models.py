@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from db_profile import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # ===========================
 # USUÁRIO (Login / Cadastro)
@@ -29,6 +30,11 @@ class News(db.Model):
     link = db.Column(db.String(300), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Índice da paginação por cursor (created_at DESC, id DESC)
+    __table_args__ = (
+        db.Index("ix_news_created_at_id", "created_at", "id"),
+    )
+
 
 # ===============================
 # TIME / PLAYERS (MEET THE SQUAD)
@@ -49,12 +55,39 @@ class Player(db.Model):
 # ============================
 # EVENTOS / PARTIDAS (SCHEDULE)
 # ============================
+# Horário UTC no momento da escrita, no formato do DateTime do SQLAlchemy
+SQL_UTCNOW = db.func.strftime("%Y-%m-%d %H:%M:%f", "now").concat("000")
+
+
 class Match(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tournament = db.Column(db.String(140), nullable=False)
     opponent = db.Column(db.String(140), nullable=False)
     date = db.Column(db.Date, nullable=False)
     time = db.Column(db.Time, nullable=False)
+    # Início da partida (date + time, horário local de MATCH_TIMEZONE): coluna
+    # gerada pelo SQLite, então acompanha o admin, a importação e a edição em
+    # massa sem código extra. O texto 'YYYY-MM-DD HH:MM:SS.ffffff' é o mesmo
+    # formato do DateTime do SQLAlchemy, então compara direto com datetimes.
+    starts_at = db.Column(db.DateTime, db.Computed("date || ' ' || time"))
+    # Última alteração (UTC), para os feeds com ?since= (NULL em linhas antigas).
+    # Calculada pelo próprio INSERT/UPDATE, já com a trava de escrita do
+    # SQLite: um commit posterior nunca grava um horário anterior
+    updated_at = db.Column(db.DateTime, default=SQL_UTCNOW, onupdate=SQL_UTCNOW)
+
+    __table_args__ = (
+        db.Index("ix_match_date_time", "date", "time"),
+        # Próximas (starts_at >= agora) e anteriores com paginação por cursor
+        db.Index("ix_match_starts_at_id", "starts_at", "id"),
+        db.Index("ix_match_updated_at", "updated_at"),
+    )
+
+
+# Partidas apagadas (mantida por trigger, ver feeds.py): os clientes do
+# /api/matches?since= precisam saber o que sumiu desde a última sincronização
+class DeletedMatch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)  # id da partida apagada
+    deleted_at = db.Column(db.DateTime, nullable=False, index=True)
 
 
 # =========================================
@@ -69,11 +102,17 @@ class Product(db.Model):
     reviews = db.Column(db.Integer, default=0)
     tag = db.Column(db.String(50), nullable=True)  # "NOVO", "BEST SELLER"
 
+    # Filtros e ordenação da /loja (tag + faixa de preço, ordem por preço)
+    __table_args__ = (
+        db.Index("ix_product_tag_price", "tag", "price", "id"),
+        db.Index("ix_product_price_id", "price", "id"),
+    )
+
 
 # CARRINHO ======================
 class Cart(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), unique=True, index=True)  # um carrinho por usuário
 
     items = db.relationship("CartItem", backref="cart", cascade="all, delete")
 
@@ -86,6 +125,11 @@ class CartItem(db.Model):
 
     product = db.relationship("Product")
 
+    # Cada produto aparece uma única vez por carrinho
+    __table_args__ = (
+        db.Index("ux_cart_item_cart_product", "cart_id", "product_id", unique=True),
+    )
+
 
 # ===============================
 # PATROCINADORES (SPONSORS)
@@ -98,7 +142,7 @@ class Sponsor(db.Model):
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(200), nullable=False)
@@ -107,4 +151,62 @@ class Order(db.Model):
     payment_method = db.Column(db.String(50), nullable=False)
     total = db.Column(db.Float, nullable=False)
     items = db.Column(db.JSON, nullable=False)  # Lista de itens como JSON
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    idempotency_key = db.Column(db.String(64), nullable=True)  # evita pedido duplicado no re-envio
+
+    lines = db.relationship("OrderLine", backref="order", cascade="all, delete-orphan", order_by="OrderLine.id")
+
+    __table_args__ = (
+        db.Index("ux_order_user_idempotency", "user_id", "idempotency_key", unique=True),
+        db.Index("ix_order_user_created_id", "user_id", "created_at", "id"),  # histórico em /perfil
+    )
+
+
+class OrderLine(db.Model):
+    """Um produto de um pedido (a versão normalizada de Order.items)."""
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=True)  # None se o produto não existe mais
+    name = db.Column(db.String(140), nullable=False)  # nome e preço no momento da compra
+    unit_price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # = Order.created_at
+
+    __table_args__ = (
+        db.Index("ix_order_line_product_created", "product_id", "created_at"),
+    )
+
+# ==========================================
+# ESTATÍSTICAS (MANTIDAS POR TRIGGERS, VER stats.py)
+# ==========================================
+class StatCounter(db.Model):
+    name = db.Column(db.String(40), primary_key=True)  # nome da tabela contada
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailySales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class DailyProductSales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(140), nullable=False)  # nome da venda mais recente
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)  # bruto (antes de cupom)
+
+    # Linhas gravadas na ordem da chave: um período vira uma leitura contínua
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class MonthlyProductSales(db.Model):
+    """O mesmo de DailyProductSales por mês ('AAAA-MM'), para períodos longos."""
+    month = db.Column(db.String(7), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(140), nullable=False)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = {"sqlite_with_rowid": False}
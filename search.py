@@ -0,0 +1,134 @@
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import inspect, text
+
+# ============================================
+# BUSCA (SQLITE FTS5)
+# ============================================
+# Um único índice FTS5 cobre notícias, produtos e jogadores. Ele é mantido por
+# triggers no próprio SQLite, então qualquer commit (admin, importação, delete
+# em massa) atualiza a busca na mesma transação.
+#
+# O rowid do índice é id * 4 + código do tipo, o que permite apagar/atualizar
+# a linha de um registro pelo rowid (sem varrer o índice).
+
+SEARCH_TABLE = "search_index"
+SEARCH_LIMIT = 20
+SEARCH_LIMIT_MAX = 50
+
+# tipo: (código, tabela, expressão do título, expressão do corpo)
+SOURCES = {
+    "news": (1, "news", "{row}.title", "{row}.description"),
+    "product": (2, "product", "{row}.name", "coalesce({row}.tag, '')"),
+    "player": (3, "player", "{row}.name", "coalesce({row}.game, '') || ' ' || {row}.role"),
+}
+
+# Título pesa mais que o corpo no bm25 (a coluna 'kind' não é indexada)
+BM25_WEIGHTS = (0.0, 10.0, 1.0)
+
+# Marcadores do snippet (trocados por <mark> depois de escapar o texto)
+_MARK_START, _MARK_END = "\ue000", "\ue001"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _create_statements():
+    statements = [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            kind UNINDEXED, title, body,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """
+    ]
+    for kind, (code, table, title, body) in SOURCES.items():
+        new_values = f"new.id * 4 + {code}, '{kind}', {title.format(row='new')}, {body.format(row='new')}"
+        statements += [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_ai AFTER INSERT ON "{table}" BEGIN
+                INSERT INTO {SEARCH_TABLE} (rowid, kind, title, body) VALUES ({new_values});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_au AFTER UPDATE ON "{table}" BEGIN
+                DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 4 + {code};
+                INSERT INTO {SEARCH_TABLE} (rowid, kind, title, body) VALUES ({new_values});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_ad AFTER DELETE ON "{table}" BEGIN
+                DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 4 + {code};
+            END
+            """,
+        ]
+    return statements
+
+
+def rebuild_index(connection):
+    """Apaga e reconstrói o índice inteiro a partir das tabelas."""
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    for kind, (code, table, title, body) in SOURCES.items():
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, kind, title, body) "
+            f"SELECT id * 4 + {code}, '{kind}', {title.format(row=table)}, {body.format(row=table)} "
+            f'FROM "{table}"'
+        ))
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+
+
+def init_search(engine, rebuild=False):
+    """
+    Cria o índice e as triggers; na primeira vez (ou com rebuild=True)
+    indexa os dados existentes. Chamar de novo depois de um db.drop_all(),
+    que apaga as triggers junto com as tabelas.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as connection:
+        created = SEARCH_TABLE not in inspect(connection).get_table_names()
+        for statement in _create_statements():
+            connection.execute(text(statement))
+        if created or rebuild:
+            rebuild_index(connection)
+    return created
+
+
+def match_expression(query):
+    """
+    Converte o texto digitado em uma expressão MATCH segura: cada palavra vira
+    um prefixo entre aspas ("pal"*) e todas precisam aparecer (AND implícito).
+    """
+    words = _WORD.findall(query or "")
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def highlight(snippet):
+    """Escapa o snippet do FTS5 e destaca os termos encontrados."""
+    html = str(escape(snippet))
+    return Markup(html.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>"))
+
+
+def search(session, query, kinds=None, limit=SEARCH_LIMIT):
+    """
+    Busca no índice, ordenado por relevância (bm25).
+    Retorna dicts com kind, id, title, snippet e score.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+
+    sql = (
+        f"SELECT kind, rowid / 4 AS id, title, "
+        f"snippet({SEARCH_TABLE}, 2, '{_MARK_START}', '{_MARK_END}', '…', 16) AS snippet, "
+        f"bm25({SEARCH_TABLE}, {', '.join(map(str, BM25_WEIGHTS))}) AS score "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :expression"
+    )
+    params = {"expression": expression, "limit": limit}
+    if kinds:
+        placeholders = ", ".join(f":kind{i}" for i in range(len(kinds)))
+        sql += f" AND kind IN ({placeholders})"
+        params.update({f"kind{i}": kind for i, kind in enumerate(kinds)})
+    sql += " ORDER BY score LIMIT :limit"
+
+    return [dict(row._mapping) for row in session.execute(text(sql), params)]
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# ============================================
+# SENHAS (POLÍTICA DE HASH + REHASH NO LOGIN)
+# ============================================
+# O algoritmo/custo vem de PASSWORD_HASH_METHOD (formato do werkzeug, ex.:
+# "scrypt:32768:8:1" ou "pbkdf2:sha256:600000"). Hashes antigos continuam
+# válidos; no próximo login com sucesso eles são refeitos com a política atual.
+
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+
+@lru_cache(maxsize=8)
+def _normalized_method(method):
+    """Prefixo que o werkzeug grava para o método (preenche os parâmetros padrão)."""
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def hash_method():
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_HASH_METHOD)
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+def needs_rehash(password_hash):
+    """True se o hash foi gerado com outro algoritmo ou outro custo."""
+    return password_hash.split("$", 1)[0] != _normalized_method(hash_method())
+
+
+@lru_cache(maxsize=8)
+def _dummy_hash(method):
+    return generate_password_hash("senha-inexistente", method=method)
+
+
+def verify_password(user, password):
+    """
+    Confere a senha do usuário (ou de None, com o mesmo custo, para não
+    revelar pelo tempo de resposta se o e-mail existe). Se a senha estiver
+    certa e o hash for de uma política antiga, troca o hash (sem commit).
+    """
+    if user is None:
+        check_password_hash(_dummy_hash(hash_method()), password)
+        return False
+    if not check_password_hash(user.password_hash, password):
+        return False
+    if needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+    return True
+
+
+# ============================================
+# LIMITE DE TENTATIVAS (TOKEN BUCKET EM MEMÓRIA)
+# ============================================
+# Cada chave (IP ou par IP + e-mail) tem um balde com 'capacity' fichas que se
+# recarrega por completo em 'period' segundos. Cada tentativa gasta uma
+# ficha, antes de qualquer hash; sem fichas a tentativa é recusada. O estado
+# é por processo (cada worker do gunicorn tem os seus baldes).
+
+MAX_KEYS = 10_000
+
+
+class TokenBucket:
+    """Baldes de fichas por chave, com limite de chaves (LRU) e thread-safe."""
+
+    def __init__(self, capacity, period, max_keys=MAX_KEYS):
+        self.capacity = capacity
+        self.rate = capacity / period  # fichas por segundo
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # chave -> (fichas, último_acesso)
+        self._lock = threading.Lock()
+
+    def _refill(self, key, now):
+        tokens, last = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - last) * self.rate)
+
+    def allow(self, key, now=None):
+        """Gasta uma ficha da chave; retorna False se o balde estiver vazio."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._refill(key, now)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def refund(self, key, now=None):
+        """Devolve a ficha gasta pela chave (sem passar da capacidade)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key] = (min(self.capacity, self._refill(key, now) + 1), now)
+
+    def retry_after(self, key, now=None):
+        """Segundos até a chave ter uma ficha de novo."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if key not in self._buckets:
+                return 0
+            missing = 1 - self._refill(key, now)
+        return max(0, int(missing / self.rate) + 1) if missing > 0 else 0
+
+
+class LoginRateLimiter:
+    """
+    Limite combinado por IP e por (IP, e-mail); os dois precisam ter ficha.
+
+    O balde do IP limita quantas senhas um endereço testa no total. O do
+    e-mail é por par (IP, e-mail): quem insiste numa conta a partir de um
+    IP só esgota o próprio par, e o dono da conta, vindo de outro IP,
+    continua entrando. Login com sucesso devolve a ficha do par.
+    """
+
+    def __init__(self, ip_limit, email_limit):
+        self.by_ip = TokenBucket(*ip_limit)
+        self.by_email = TokenBucket(*email_limit)
+
+    @staticmethod
+    def _email_key(ip, email):
+        return ip, (email or "").strip().lower()
+
+    def allow(self, ip, email):
+        # Com o IP já bloqueado a ficha do par não é gasta
+        if not self.by_ip.allow(ip):
+            return False
+        return self.by_email.allow(self._email_key(ip, email))
+
+    def succeeded(self, ip, email):
+        """Login certo não conta como tentativa contra a conta."""
+        self.by_email.refund(self._email_key(ip, email))
+
+    def retry_after(self, ip, email):
+        return max(self.by_ip.retry_after(ip), self.by_email.retry_after(self._email_key(ip, email)))
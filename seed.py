@@ -2,6 +2,9 @@ from app import app
 from models import db, User, News, Player, Match, Product, Sponsor
 from datetime import datetime, date, time
 from werkzeug.security import generate_password_hash
+import search
+import stats
+import feeds
 
 # IMPORTANTE: Garanta que as pastas 'static/uploads/players', 'static/uploads/products',
 # e 'static/uploads/sponsors' existam e contenham os arquivos de imagem listados abaixo.
@@ -10,6 +13,10 @@ with app.app_context():
     print("Limpando tabelas...")
     db.drop_all()
     db.create_all()
+    # O drop_all apaga as triggers da busca, das estatísticas e dos feeds
+    search.init_search(db.engine, rebuild=True)
+    stats.init_stats(db.engine)
+    feeds.init_feeds(db.engine)
 
     # ===============================
     # USERS (admin + exemplo)
@@ -0,0 +1,130 @@
+import hashlib
+import time
+
+from flask import current_app, session
+
+from cache import model_version
+from models import Product
+import cart_service
+
+# ============================================
+# CARRINHO NA SESSÃO (COOKIE ASSINADO)
+# ============================================
+# As alterações do carrinho ficam só na sessão do navegador. O banco
+# (Cart/CartItem) só é atualizado no login, no checkout, no logout ou quando
+# a última sincronização tem mais de CART_FLUSH_INTERVAL segundos.
+
+SESSION_KEY = "cart"
+DIRTY_KEY = "cart_dirty"
+FLUSHED_AT_KEY = "cart_flushed_at"
+
+
+class SessionCartItem:
+    """Item com a mesma interface de CartItem usada nos templates."""
+
+    def __init__(self, product, quantity):
+        self.product = product
+        self.product_id = product.id
+        self.quantity = quantity
+
+
+class SessionCart:
+    """Carrinho com a mesma interface de Cart (items, total_price)."""
+
+    def __init__(self, items):
+        self.items = items
+        self.total_price = 0.0
+
+
+def get_items():
+    """Retorna {product_id: quantidade} do carrinho da sessão."""
+    return {int(product_id): quantity for product_id, quantity in session.get(SESSION_KEY, {}).items()}
+
+
+def _save(items):
+    session[SESSION_KEY] = {str(product_id): quantity for product_id, quantity in items.items()}
+    session[DIRTY_KEY] = True
+
+
+def add_item(product_id, quantity=1):
+    """Soma unidades ao item; retorna False se o limite do cookie foi atingido."""
+    items = get_items()
+    if product_id not in items and len(items) >= current_app.config["CART_MAX_ITEMS"]:
+        return False
+    items[product_id] = items.get(product_id, 0) + quantity
+    _save(items)
+    return True
+
+
+def set_quantity(product_id, quantity):
+    """Define a quantidade (<= 0 remove); retorna 1 se o item existia, senão 0."""
+    if quantity <= 0:
+        return remove_item(product_id)
+    items = get_items()
+    if product_id not in items:
+        return 0
+    items[product_id] = quantity
+    _save(items)
+    return 1
+
+
+def remove_item(product_id):
+    """Remove o item; retorna 1 se ele existia, senão 0."""
+    items = get_items()
+    if items.pop(product_id, None) is None:
+        return 0
+    _save(items)
+    return 1
+
+
+def clear():
+    for key in (SESSION_KEY, DIRTY_KEY, FLUSHED_AT_KEY):
+        session.pop(key, None)
+
+
+def load_cart():
+    """Monta o carrinho da sessão buscando todos os produtos em um SELECT."""
+    items = get_items()
+    products = Product.query.filter(Product.id.in_(items)).all() if items else []
+    by_id = {product.id: product for product in products}
+    # Produtos apagados pelo admin são ignorados, como em calculate_cart_total()
+    return SessionCart([
+        SessionCartItem(by_id[product_id], quantity)
+        for product_id, quantity in items.items() if product_id in by_id
+    ])
+
+
+def etag():
+    """ETag do carrinho da sessão (conteúdo + versão dos produtos), sem SQL."""
+    raw = f"{sorted(get_items().items())}:{model_version('Product')}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def flush(user_id, force=False):
+    """
+    Grava o carrinho da sessão no banco se houver mudanças pendentes.
+    Sem 'force', grava no máximo uma vez a cada CART_FLUSH_INTERVAL segundos.
+    """
+    if not session.get(DIRTY_KEY):
+        return False
+    interval = current_app.config["CART_FLUSH_INTERVAL"]
+    if not force and time.time() - session.get(FLUSHED_AT_KEY, 0) < interval:
+        return False
+
+    cart_service.replace_items(user_id, get_items())
+    session[DIRTY_KEY] = False
+    session[FLUSHED_AT_KEY] = time.time()
+    return True
+
+
+def merge_on_login(user_id):
+    """Junta o carrinho salvo no banco com o carrinho anônimo da sessão."""
+    items = cart_service.get_items(user_id)
+    anonymous_items = get_items()
+    for product_id, quantity in anonymous_items.items():
+        items[product_id] = items.get(product_id, 0) + quantity
+
+    session[SESSION_KEY] = {str(product_id): quantity for product_id, quantity in items.items()}
+    session[DIRTY_KEY] = bool(anonymous_items)
+    session[FLUSHED_AT_KEY] = 0
+    flush(user_id, force=True)
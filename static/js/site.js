@@ -0,0 +1,17 @@
+// JS comum a todas as páginas (carregado com defer: o HTML já foi lido)
+
+// Ícones feather-icons
+if (typeof feather !== 'undefined') {
+    feather.replace();
+}
+
+// Menu mobile
+(function () {
+    const button = document.getElementById('mobile-menu-button');
+    const menu = document.getElementById('mobile-menu');
+    if (button && menu) {
+        button.addEventListener('click', function () {
+            menu.classList.toggle('hidden');
+        });
+    }
+})();
@@ -0,0 +1,276 @@
+import datetime
+
+from flask import current_app
+from sqlalchemy import func, select, text, union_all
+
+from models import (
+    db, DailyProductSales, DailySales, Match, MonthlyProductSales, News, Order, OrderLine,
+    Player, Product, Sponsor, StatCounter,
+)
+
+# ============================================
+# ESTATÍSTICAS DO DASHBOARD
+# ============================================
+# O SQLite conta linhas varrendo a tabela, então o dashboard lê contadores
+# prontos em stat_counter e os pedidos/faturamento agregados por dia em
+# daily_sales; as vendas por produto ficam em daily_product_sales e
+# monthly_product_sales (uma linha por dia/mês e produto, alimentadas pelas
+# OrderLine). As tabelas são mantidas por triggers no próprio SQLite (como o
+# índice da busca): assim também contam as importações e os deletes em
+# massa, que não passam pelos eventos do ORM.
+#
+# Com STATS_SUMMARY_TABLE = False nada disso é criado e os contadores vêm de
+# um único SELECT com subconsultas COUNT(*) e os relatórios agregam direto
+# order/order_line.
+
+COUNTED_MODELS = {
+    "players": Player,
+    "matches": Match,
+    "products": Product,
+    "news": News,
+    "sponsors": Sponsor,
+    "orders": Order,
+}
+SALES_DAYS = 30
+TOP_PRODUCTS_LIMIT = 10
+
+_ORDER_DAY = "date({row}.created_at)"  # dia em UTC, como Order.created_at / OrderLine.created_at
+
+# Rollups de vendas por produto: tabela -> (coluna do período, expressão)
+PRODUCT_ROLLUPS = {
+    "daily_product_sales": ("day", _ORDER_DAY),
+    "monthly_product_sales": ("month", "strftime('%Y-%m', {row}.created_at)"),
+}
+
+
+def summary_enabled():
+    return current_app.config.get("STATS_SUMMARY_TABLE", True)
+
+
+def _create_statements():
+    statements = []
+    for name, model in COUNTED_MODELS.items():
+        table = model.__tablename__
+        for event, delta in (("INSERT", "+ 1"), ("DELETE", "- 1")):
+            initial = 1 if event == "INSERT" else 0
+            statements.append(f"""
+                CREATE TRIGGER IF NOT EXISTS stats_{table}_{event.lower()} AFTER {event} ON "{table}" BEGIN
+                    INSERT INTO stat_counter (name, value) VALUES ('{name}', {initial})
+                    ON CONFLICT (name) DO UPDATE SET value = value {delta};
+                END
+            """)
+
+    new_day, old_day = _ORDER_DAY.format(row="new"), _ORDER_DAY.format(row="old")
+    add_new = f"""
+        INSERT INTO daily_sales (day, orders, revenue) VALUES ({new_day}, 1, new.total)
+        ON CONFLICT (day) DO UPDATE SET orders = orders + 1, revenue = revenue + excluded.revenue;
+    """
+    remove_old = f"""
+        UPDATE daily_sales SET orders = orders - 1, revenue = revenue - old.total WHERE day = {old_day};
+    """
+    statements += [
+        f'CREATE TRIGGER IF NOT EXISTS stats_sales_insert AFTER INSERT ON "order" BEGIN {add_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS stats_sales_delete AFTER DELETE ON "order" BEGIN {remove_old} END',
+        f"""
+        CREATE TRIGGER IF NOT EXISTS stats_sales_update AFTER UPDATE OF total, created_at ON "order" BEGIN
+            {remove_old}
+            {add_new}
+        END
+        """,
+    ]
+
+    # Linhas sem produto (produto já apagado) ficam fora do ranking
+    for table, (key, bucket) in PRODUCT_ROLLUPS.items():
+        statements += [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS stats_{table}_insert AFTER INSERT ON order_line
+            WHEN new.product_id IS NOT NULL BEGIN
+                INSERT INTO {table} ({key}, product_id, name, units, revenue)
+                VALUES ({bucket.format(row="new")}, new.product_id, new.name, new.quantity, new.unit_price * new.quantity)
+                ON CONFLICT ({key}, product_id) DO UPDATE SET
+                    name = excluded.name,
+                    units = units + excluded.units,
+                    revenue = revenue + excluded.revenue;
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS stats_{table}_delete AFTER DELETE ON order_line
+            WHEN old.product_id IS NOT NULL BEGIN
+                UPDATE {table}
+                SET units = units - old.quantity, revenue = revenue - old.unit_price * old.quantity
+                WHERE {key} = {bucket.format(row="old")} AND product_id = old.product_id;
+            END
+            """,
+        ]
+    return statements
+
+
+def rebuild_stats(connection):
+    """Recalcula os contadores e o faturamento diário a partir das tabelas."""
+    connection.execute(text("DELETE FROM stat_counter"))
+    for name, model in COUNTED_MODELS.items():
+        connection.execute(
+            text(f'INSERT INTO stat_counter (name, value) SELECT :name, COUNT(*) FROM "{model.__tablename__}"'),
+            {"name": name},
+        )
+    connection.execute(text("DELETE FROM daily_sales"))
+    connection.execute(text(
+        f"INSERT INTO daily_sales (day, orders, revenue) "
+        f"SELECT {_ORDER_DAY.format(row='o')}, COUNT(*), SUM(o.total) FROM \"order\" AS o GROUP BY 1"
+    ))
+    for table, (key, bucket) in PRODUCT_ROLLUPS.items():
+        connection.execute(text(f"DELETE FROM {table}"))
+        connection.execute(text(
+            f"INSERT INTO {table} ({key}, product_id, name, units, revenue) "
+            f"SELECT {bucket.format(row='l')}, l.product_id, MAX(l.name), SUM(l.quantity), SUM(l.unit_price * l.quantity) "
+            f"FROM order_line AS l WHERE l.product_id IS NOT NULL GROUP BY 1, 2"
+        ))
+
+
+def init_stats(engine):
+    """Cria as triggers e, se stat_counter estiver vazia, faz a contagem inicial."""
+    if not summary_enabled() or engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as connection:
+        for statement in _create_statements():
+            connection.execute(text(statement))
+        empty = connection.execute(text("SELECT COUNT(*) FROM stat_counter")).scalar() == 0
+        if empty:
+            rebuild_stats(connection)
+    return empty
+
+
+def live_counts():
+    """Todos os contadores em um único SELECT (subconsultas COUNT(*))."""
+    statement = select(*(
+        select(func.count()).select_from(model).scalar_subquery().label(name)
+        for name, model in COUNTED_MODELS.items()
+    ))
+    return dict(db.session.execute(statement).one()._mapping)
+
+
+def summary_counts():
+    """Contadores mantidos pelas triggers (uma leitura de poucas linhas)."""
+    counts = dict.fromkeys(COUNTED_MODELS, 0)
+    counts.update(db.session.execute(select(StatCounter.name, StatCounter.value)).all())
+    return counts
+
+
+def dashboard_counts():
+    return summary_counts() if summary_enabled() else live_counts()
+
+
+def revenue_by_day(start, end):
+    """Lista de (dia, pedidos, faturamento) entre start e end (datas inclusivas), do mais recente."""
+    if summary_enabled():
+        statement = (
+            select(DailySales.day, DailySales.orders, DailySales.revenue)
+            .where(DailySales.day.between(start, end), DailySales.orders > 0)
+            .order_by(DailySales.day.desc())
+        )
+    else:
+        day = func.date(Order.created_at)
+        statement = (
+            select(day, func.count(Order.id), func.sum(Order.total))
+            .where(Order.created_at >= start, Order.created_at < end + datetime.timedelta(days=1))
+            .group_by(day)
+            .order_by(day.desc())
+        )
+    return db.session.execute(statement).all()
+
+
+def utc_today():
+    """Hoje em UTC: os rollups agrupam por date(created_at), que é UTC."""
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def daily_sales(days=SALES_DAYS):
+    """Faturamento por dia nos últimos 'days' dias."""
+    today = utc_today()
+    return revenue_by_day(today - datetime.timedelta(days=days - 1), today)
+
+
+def _full_months(start, end):
+    """
+    Meses inteiros contidos em [start, end]: retorna (primeiro dia do primeiro
+    mês, primeiro dia do mês seguinte ao último) ou None se não houver nenhum.
+    """
+    first = start if start.day == 1 else (start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    after_last = (end + datetime.timedelta(days=1)).replace(day=1)
+    return (first, after_last) if first < after_last else None
+
+
+def _rollup_rows(start, end):
+    """
+    SELECTs (product_id, name, units, revenue) que cobrem o período: meses
+    inteiros vêm de monthly_product_sales e as pontas de daily_product_sales.
+    Um ano inteiro soma ~12 x produtos linhas em vez de ~365 x produtos.
+    """
+    def daily(first_day, last_day):
+        return select(
+            DailyProductSales.product_id, DailyProductSales.name,
+            DailyProductSales.units, DailyProductSales.revenue,
+        ).where(DailyProductSales.day.between(first_day, last_day))
+
+    months = _full_months(start, end)
+    if months is None:
+        return [daily(start, end)]
+
+    first, after_last = months
+    parts = [
+        select(
+            MonthlyProductSales.product_id, MonthlyProductSales.name,
+            MonthlyProductSales.units, MonthlyProductSales.revenue,
+        ).where(
+            MonthlyProductSales.month >= first.strftime("%Y-%m"),
+            MonthlyProductSales.month < after_last.strftime("%Y-%m"),
+        )
+    ]
+    if start < first:
+        parts.append(daily(start, first - datetime.timedelta(days=1)))
+    if after_last <= end:
+        parts.append(daily(after_last, end))
+    return parts
+
+
+def product_sales(start, end, limit=TOP_PRODUCTS_LIMIT):
+    """
+    Produtos mais vendidos entre start e end (inclusivo):
+    lista de (product_id, nome, unidades, faturamento bruto).
+    """
+    if summary_enabled():
+        parts = _rollup_rows(start, end)
+        rows = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+        product_id, name = rows.c.product_id, rows.c.name
+        units, revenue = func.sum(rows.c.units), func.sum(rows.c.revenue)
+        period = product_id.isnot(None)
+    else:
+        product_id, name = OrderLine.product_id, OrderLine.name
+        units = func.sum(OrderLine.quantity)
+        revenue = func.sum(OrderLine.unit_price * OrderLine.quantity)
+        period = (
+            product_id.isnot(None)
+            & (OrderLine.created_at >= start)
+            & (OrderLine.created_at < end + datetime.timedelta(days=1))
+        )
+
+    statement = (
+        select(product_id, func.max(name), units, revenue)
+        .where(period)
+        .group_by(product_id)
+        .having(units > 0)  # pedidos apagados deixam linhas zeradas no rollup
+        .order_by(units.desc(), product_id)
+        .limit(limit)
+    )
+    return db.session.execute(statement).all()
+
+
+def sales_totals():
+    """(pedidos, faturamento) de todo o período."""
+    if summary_enabled():
+        # Uma linha por dia: continua pequeno com milhões de pedidos
+        statement = select(func.coalesce(func.sum(DailySales.orders), 0), func.coalesce(func.sum(DailySales.revenue), 0.0))
+    else:
+        statement = select(func.count(Order.id), func.coalesce(func.sum(Order.total), 0.0))
+    orders, revenue = db.session.execute(statement).one()
+    return orders, revenue
@@ -0,0 +1,99 @@
+"""
+Fixtures dos testes: o app.py de sempre, com banco e instance/ temporários.
+
+As variáveis de ambiente precisam estar definidas antes do 'import app' (o
+app é criado na importação), então ficam no topo deste arquivo. Cada teste
+começa com o banco vazio e o cache de páginas/valores invalidado.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+WORKDIR = tempfile.mkdtemp(prefix="royalehub-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'site.db')}"
+os.environ["INSTANCE_PATH"] = os.path.join(WORKDIR, "instance")
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"  # hash barato: os testes fazem muitos logins
+os.environ.pop("DATABASE_REPLICA_URL", None)
+
+import app as site  # noqa: E402
+import security  # noqa: E402
+from cache import bump_version  # noqa: E402
+from models import db, User, Product, Match  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    site.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    # Limitador novo a cada teste: as tentativas de um teste não vazam para o outro
+    monkeypatch.setattr(site, "login_limiter", security.LoginRateLimiter(
+        site.app.config["LOGIN_RATE_LIMIT_IP"], site.app.config["LOGIN_RATE_LIMIT_EMAIL"]
+    ))
+    with site.app.app_context():
+        yield site.app
+        db.session.rollback()
+        with db.engine.begin() as connection:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
+            # A trigger de lápides roda no DELETE de match, depois da própria tabela
+            connection.execute(db.metadata.tables["deleted_match"].delete())
+        db.session.remove()
+        bump_version(*(mapper.class_.__name__ for mapper in db.Model.registry.mappers))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make(email="torcedor@teste.com", password="senha123", **fields):
+        user = User(
+            username=fields.pop("username", email.split("@")[0]), email=email,
+            password_hash=security.hash_password(password), **fields
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def make_product(app):
+    def make(name="Camiseta", price=100.0, **fields):
+        product = Product(name=name, price=price, image_file=fields.pop("image_file", "camiseta.jpg"), **fields)
+        db.session.add(product)
+        db.session.commit()
+        return product
+    return make
+
+
+@pytest.fixture
+def make_match(app):
+    def make(tournament="CBLOL", opponent="LOUD", starts_at="2030-01-10 18:00"):
+        date, time = starts_at.split()
+        match = Match(
+            tournament=tournament, opponent=opponent,
+            date=site.datetime.date.fromisoformat(date), time=site.datetime.time.fromisoformat(time),
+        )
+        db.session.add(match)
+        db.session.commit()
+        return match
+    return make
+
+
+@pytest.fixture
+def log_in(client):
+    """Autentica o client direto na sessão (sem passar pelo formulário de login)."""
+    def log_in(user):
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user.id)
+            session["_fresh"] = True
+    return log_in
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import cart_service
+import checkout_service
+from models import db, CartItem, Order, OrderLine
+
+DETAILS = {
+    "name": "Ana Torcedora",
+    "email": "ana@teste.com",
+    "address": "Rua A, 1",
+    "city": "São Paulo",
+    "zip_code": "01000-000",
+    "payment_method": "pix",
+}
+
+
+@pytest.fixture
+def buyer(make_user, make_product):
+    user = make_user()
+    camiseta = make_product("Camiseta", 100.0)
+    bone = make_product("Boné", 50.0)
+    cart_service.add_item(user.id, camiseta.id, 2)
+    cart_service.add_item(user.id, bone.id)
+    return user
+
+
+def test_place_order_snapshots_cart_and_empties_it(buyer):
+    order, created = checkout_service.place_order(buyer.id, DETAILS, "chave-1", discount_rate=0.1)
+
+    assert created
+    assert order.total == pytest.approx(225.0)
+    assert sorted((item["name"], item["quantity"]) for item in order.items) == [("Boné", 1), ("Camiseta", 2)]
+    assert OrderLine.query.filter_by(order_id=order.id).count() == 2
+    assert cart_service.get_items(buyer.id) == {}
+
+
+def test_place_order_with_used_key_returns_the_first_order(buyer, make_product):
+    first, _ = checkout_service.place_order(buyer.id, DETAILS, "chave-1")
+    # Outro envio com a mesma chave (a corrida que passa pela checagem da rota)
+    cart_service.add_item(buyer.id, make_product("Caneca", 30.0).id)
+
+    again, created = checkout_service.place_order(buyer.id, DETAILS, "chave-1")
+
+    assert not created
+    assert again.id == first.id
+    assert Order.query.count() == 1
+    assert CartItem.query.count() == 1  # a transação perdedora não esvaziou o carrinho
+
+
+def test_place_order_with_empty_cart_returns_existing_order(buyer):
+    first, _ = checkout_service.place_order(buyer.id, DETAILS, "chave-1")
+
+    assert checkout_service.place_order(buyer.id, DETAILS, "chave-1") == (first, False)
+    assert checkout_service.place_order(buyer.id, DETAILS, "chave-2") == (None, False)
+
+
+def test_place_order_reraises_other_integrity_errors(buyer):
+    with pytest.raises(IntegrityError):
+        checkout_service.place_order(buyer.id, dict(DETAILS, name=None), "chave-1")
+
+    db.session.rollback()
+    assert Order.query.count() == 0
+    assert len(cart_service.get_items(buyer.id)) == 2
+
+
+def test_checkout_form_resubmission_creates_one_order(client, log_in, buyer):
+    log_in(buyer)
+    form = dict(DETAILS, idempotency_key="chave-do-formulario")
+
+    first = client.post("/checkout", data=form)
+    second = client.post("/checkout", data=form)
+
+    assert first.status_code == second.status_code == 302
+    assert first.headers["Location"] == second.headers["Location"] == "/confirmation"
+    assert Order.query.count() == 1
+
+
+def test_checkout_rejects_missing_fields_and_keeps_the_cart(client, log_in, buyer):
+    log_in(buyer)
+    form = dict(DETAILS, name="  ", idempotency_key="chave-1")
+
+    response = client.post("/checkout", data=form)
+
+    assert response.headers["Location"] == "/checkout"
+    assert Order.query.count() == 0
+    assert len(cart_service.get_items(buyer.id)) == 2
@@ -0,0 +1,104 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import update
+
+import feeds
+from models import db, DeletedMatch, Match
+
+TIMEZONE = ZoneInfo("America/Sao_Paulo")
+T0 = datetime.datetime(2030, 1, 1, 12, 0, 0, 500000)
+MS = datetime.timedelta(milliseconds=1)
+
+
+def _stamp(model, row_id, column, value):
+    db.session.execute(update(model).where(model.id == row_id).values(**{column: value}))
+    db.session.commit()
+
+
+def _ids(changes):
+    return [match["id"] for match in changes["matches"]], changes["deleted"]
+
+
+def test_changes_since_includes_the_boundary_and_skips_older(make_match):
+    older, boundary, newer = make_match(), make_match(), make_match()
+    _stamp(Match, older.id, "updated_at", T0 - MS)
+    _stamp(Match, boundary.id, "updated_at", T0)
+    _stamp(Match, newer.id, "updated_at", T0 + MS)
+
+    changes = feeds.changes_since(T0, TIMEZONE)
+
+    assert sorted(_ids(changes)[0]) == [boundary.id, newer.id]
+    assert changes["next_since"] == "2030-01-01T12:00:00.501000Z"
+
+
+def test_next_since_round_trips_and_returns_the_last_change_again(make_match):
+    match = make_match()
+    _stamp(Match, match.id, "updated_at", T0)
+
+    since = feeds.parse_since(feeds.changes_since(T0 - MS, TIMEZONE)["next_since"])
+
+    # Mesmo milissegundo: a última mudança volta (o cliente sobrescreve) em vez de se perder
+    assert since == T0
+    assert _ids(feeds.changes_since(since, TIMEZONE)) == ([match.id], [])
+
+
+def test_changes_since_without_changes_keeps_since(make_match):
+    _stamp(Match, make_match().id, "updated_at", T0 - MS)
+
+    assert feeds.changes_since(T0, TIMEZONE) == {
+        "matches": [], "deleted": [], "next_since": "2030-01-01T12:00:00.500000Z",
+    }
+
+
+def test_deleted_matches_use_the_same_boundary(make_match):
+    gone_before, gone_at, gone_after = make_match(), make_match(), make_match()
+    ids = [gone_before.id, gone_at.id, gone_after.id]
+    Match.query.filter(Match.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    for match_id, deleted_at in zip(ids, (T0 - MS, T0, T0 + MS)):
+        _stamp(DeletedMatch, match_id, "deleted_at", deleted_at)
+
+    changes = feeds.changes_since(T0, TIMEZONE)
+
+    assert sorted(changes["deleted"]) == ids[1:]
+    assert changes["next_since"] == "2030-01-01T12:00:00.501000Z"
+
+
+def test_reused_id_drops_the_tombstone(make_match):
+    match = make_match()
+    match_id = match.id
+    db.session.delete(match)
+    db.session.commit()
+    assert db.session.get(DeletedMatch, match_id) is not None
+
+    assert make_match().id == match_id  # o SQLite reaproveita o maior id
+    assert db.session.get(DeletedMatch, match_id) is None
+
+
+def test_updated_at_is_stamped_by_every_write(make_match):
+    match = make_match()
+    match_id, created = match.id, match.updated_at
+    assert created is not None
+
+    match.opponent = "FURIA"
+    db.session.commit()
+    assert db.session.get(Match, match_id).updated_at >= created
+
+    # UPDATE em massa (edição em massa do admin) também passa pelo onupdate
+    db.session.execute(update(Match).where(Match.id == match_id).values(opponent="MIBR"))
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Match, match_id).updated_at >= created
+
+
+def test_api_matches_since_returns_the_delta(client, make_match):
+    match = make_match()
+    _stamp(Match, match.id, "updated_at", T0)
+
+    full = client.get("/api/matches").get_json()
+    delta = client.get("/api/matches", query_string={"since": full["next_since"]}).get_json()
+
+    assert [row["id"] for row in full["matches"]] == [match.id]
+    assert _ids(delta) == ([match.id], [])
+    assert client.get("/api/matches", query_string={"since": "ontem"}).status_code == 400
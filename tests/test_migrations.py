@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from migrations import upgrade_database
+
+# Esquema do primeiro commit (antes dos índices únicos do carrinho e das
+# colunas novas): o que um instance/site.db antigo tem
+BASELINE_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER NOT NULL, username VARCHAR(40) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL, is_admin BOOLEAN, created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE news (
+    id INTEGER NOT NULL, title VARCHAR(140) NOT NULL, description TEXT NOT NULL,
+    image_file VARCHAR(300) NOT NULL, link VARCHAR(300), created_at DATETIME, PRIMARY KEY (id)
+);
+CREATE TABLE player (
+    id INTEGER NOT NULL, name VARCHAR(80) NOT NULL, role VARCHAR(80) NOT NULL, game VARCHAR(60),
+    image_file VARCHAR(300) NOT NULL, twitter VARCHAR(300), instagram VARCHAR(300),
+    youtube VARCHAR(300), twitch VARCHAR(300), PRIMARY KEY (id)
+);
+CREATE TABLE "match" (
+    id INTEGER NOT NULL, tournament VARCHAR(140) NOT NULL, opponent VARCHAR(140) NOT NULL,
+    date DATE NOT NULL, time TIME NOT NULL, PRIMARY KEY (id)
+);
+CREATE TABLE product (
+    id INTEGER NOT NULL, name VARCHAR(140) NOT NULL, price FLOAT NOT NULL,
+    image_file VARCHAR(300) NOT NULL, rating INTEGER, reviews INTEGER, tag VARCHAR(50), PRIMARY KEY (id)
+);
+CREATE TABLE sponsor (
+    id INTEGER NOT NULL, name VARCHAR(140) NOT NULL, logo_file VARCHAR(300) NOT NULL,
+    website VARCHAR(300), PRIMARY KEY (id)
+);
+CREATE TABLE cart (
+    id INTEGER NOT NULL, user_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE "order" (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL,
+    email VARCHAR(120) NOT NULL, address VARCHAR(200) NOT NULL, city VARCHAR(100) NOT NULL,
+    zip_code VARCHAR(10) NOT NULL, payment_method VARCHAR(50) NOT NULL, total FLOAT NOT NULL,
+    items JSON NOT NULL, created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE cart_item (
+    id INTEGER NOT NULL, cart_id INTEGER, product_id INTEGER, quantity INTEGER, PRIMARY KEY (id),
+    FOREIGN KEY(cart_id) REFERENCES cart (id), FOREIGN KEY(product_id) REFERENCES product (id)
+);
+"""
+
+BASELINE_ROWS = """
+INSERT INTO user VALUES (1, 'ana', 'ana@teste.com', 'x', 0, NULL), (2, 'bia', 'bia@teste.com', 'x', 0, NULL);
+INSERT INTO product VALUES (1, 'Camiseta', 100, 'a.jpg', 5, 0, NULL), (2, 'Boné', 50, 'b.jpg', 5, 0, NULL);
+-- ana tem dois carrinhos; carrinhos anônimos (user_id NULL) não são duplicatas
+INSERT INTO cart VALUES (1, 1), (2, 1), (3, 2), (4, NULL), (5, NULL);
+INSERT INTO cart_item VALUES
+    (1, 1, 1, 2), (2, 2, 1, 3), (3, 2, 2, 1),
+    (4, 3, 2, 1), (5, 3, 2, 4),
+    (6, 4, 1, 1), (7, 5, 1, 1);
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = tmp_path / "antigo.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(BASELINE_SCHEMA + BASELINE_ROWS)
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+def _rows(engine, sql):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(sql).all()
+
+
+def test_upgrade_merges_duplicate_carts_before_unique_indexes(baseline_db):
+    created = upgrade_database(baseline_db)
+
+    assert "ix_cart_user_id" in created
+    assert "ux_cart_item_cart_product" in created
+    # O carrinho mais antigo de cada usuário fica com os itens dos outros
+    assert _rows(baseline_db, "SELECT id, user_id FROM cart ORDER BY id") == [(1, 1), (3, 2), (4, None), (5, None)]
+    # Linhas repetidas (carrinho, produto) viram uma só, com as quantidades somadas
+    assert _rows(baseline_db, "SELECT cart_id, product_id, quantity FROM cart_item ORDER BY id") == [
+        (1, 1, 5), (1, 2, 1), (3, 2, 5), (4, 1, 1), (5, 1, 1),
+    ]
+
+
+def test_upgrade_adds_missing_columns_and_indexes(baseline_db):
+    created = upgrade_database(baseline_db)
+
+    inspector = inspect(baseline_db)
+    assert "order.idempotency_key" in created
+    assert "idempotency_key" in {column["name"] for column in inspector.get_columns("order")}
+    assert "updated_at" in {column["name"] for column in inspector.get_columns("match")}
+    unique = {index["name"] for index in inspector.get_indexes("cart_item") if index["unique"]}
+    assert "ux_cart_item_cart_product" in unique
+
+
+def test_upgrade_is_idempotent(baseline_db):
+    assert upgrade_database(baseline_db)
+    assert upgrade_database(baseline_db) == []
@@ -0,0 +1,71 @@
+import datetime
+
+import pytest
+from sqlalchemy import update
+
+import app as site
+from models import db, Match, News
+
+MONDAY = datetime.datetime(2030, 1, 7, 12, 0)
+
+
+@pytest.fixture
+def news(app):
+    """7 notícias: ids 3, 4 e 5 no mesmo instante, 6 e 7 sem created_at."""
+    created = [MONDAY, MONDAY + datetime.timedelta(hours=1)] + [MONDAY + datetime.timedelta(hours=2)] * 3
+    for number, created_at in enumerate(created + [MONDAY] * 2, start=1):
+        db.session.add(News(id=number, title=f"Notícia {number}", description="-", image_file="n.jpg",
+                            created_at=created_at))
+    db.session.commit()
+    # None no construtor cairia no default (utcnow): registros antigos vêm do banco assim
+    db.session.execute(update(News).where(News.id.in_([6, 7])).values(created_at=None))
+    db.session.commit()
+
+
+def _walk(paginate, limit):
+    """Todas as páginas seguindo o próximo cursor; retorna os ids de cada página."""
+    pages, cursor = [], None
+    while True:
+        items, cursor = paginate(cursor, limit)
+        pages.append([item.id for item in items])
+        if cursor is None:
+            return pages
+
+
+def test_news_pages_follow_created_at_and_id_without_gaps(news):
+    assert _walk(site.paginate_news, 2) == [[5, 4], [3, 2], [1]]
+
+
+def test_news_cursor_inside_a_tie_continues_with_the_lower_ids(news):
+    first, cursor = site.paginate_news(limit=1)
+
+    assert [item.id for item in first] == [5]
+    assert [item.id for item in site.paginate_news(cursor, 10)[0]] == [4, 3, 2, 1]
+
+
+def test_rows_without_sort_key_are_left_out(news):
+    pages = _walk(site.paginate_news, 10)
+
+    assert pages == [[5, 4, 3, 2, 1]]
+
+
+def test_last_full_page_has_no_next_cursor(news):
+    items, cursor = site.paginate_news(limit=5)
+
+    assert len(items) == 5 and cursor is None
+
+
+@pytest.mark.parametrize("cursor", ["nao-e-base64!", "bGl4bw==", ""])
+def test_invalid_cursor_starts_from_the_first_page(news, cursor):
+    assert [item.id for item in site.paginate_news(cursor, 2)[0]] == [5, 4]
+
+
+def test_ascending_cursor_on_another_column(make_match):
+    for starts_at in ("2030-01-10 18:00", "2030-01-10 18:00", "2030-01-11 15:00", "2030-01-09 20:00"):
+        make_match(starts_at=starts_at)
+
+    def paginate(cursor, limit):
+        query = Match.query.order_by(Match.starts_at, Match.id)
+        return site.paginate_by_cursor(query, Match, cursor, limit, column="starts_at", descending=False)
+
+    assert _walk(paginate, 3) == [[4, 1, 2], [3]]
@@ -0,0 +1,80 @@
+import pytest
+
+from security import LoginRateLimiter, TokenBucket
+
+IP_LIMIT = (20, 60)
+EMAIL_LIMIT = (5, 300)
+
+
+@pytest.fixture
+def limiter():
+    return LoginRateLimiter(IP_LIMIT, EMAIL_LIMIT)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(2, 10)  # uma ficha a cada 5 s
+
+    assert bucket.allow("k", now=0) and bucket.allow("k", now=0)
+    assert not bucket.allow("k", now=0)
+    assert 5 <= bucket.retry_after("k", now=0) <= 6  # arredonda para cima
+    assert not bucket.allow("k", now=4.9)
+    assert bucket.allow("k", now=5.1)
+
+
+def test_token_bucket_refund_never_exceeds_capacity():
+    bucket = TokenBucket(2, 10)
+    bucket.refund("nova", now=0)  # chave sem tentativas: nada a devolver
+    bucket.allow("k", now=0)
+    bucket.refund("k", now=0)
+    bucket.refund("k", now=0)
+
+    assert [bucket.allow("k", now=0) for _ in range(3)] == [True, True, False]
+
+
+def test_lockout_after_failed_attempts_on_one_account(limiter):
+    attempts = [limiter.allow("1.1.1.1", "ana@teste.com") for _ in range(6)]
+
+    assert attempts == [True] * 5 + [False]
+    assert limiter.retry_after("1.1.1.1", "ana@teste.com") > 0
+    # E-mail normalizado: trocar maiúsculas não ganha fichas novas
+    assert not limiter.allow("1.1.1.1", " ANA@teste.com ")
+
+
+def test_lockout_is_per_ip_and_email_pair(limiter):
+    for _ in range(6):
+        limiter.allow("6.6.6.6", "ana@teste.com")
+
+    assert limiter.allow("1.1.1.1", "ana@teste.com")  # a dona da conta, de outro IP
+    assert limiter.allow("6.6.6.6", "bia@teste.com")  # o IP ainda tem fichas para outra conta
+
+
+def test_ip_bucket_limits_attempts_across_accounts(limiter):
+    attempts = [limiter.allow("6.6.6.6", f"conta{n}@teste.com") for n in range(21)]
+
+    assert attempts == [True] * 20 + [False]
+
+
+def test_successful_login_refunds_the_pair(limiter):
+    for _ in range(4):
+        assert limiter.allow("1.1.1.1", "ana@teste.com")
+    limiter.succeeded("1.1.1.1", "ana@teste.com")
+
+    assert limiter.allow("1.1.1.1", "ana@teste.com")
+    assert limiter.allow("1.1.1.1", "ana@teste.com")
+    assert not limiter.allow("1.1.1.1", "ana@teste.com")
+
+
+def _login(client, email, password, ip):
+    return client.post("/login", data={"email": email, "password": password},
+                       headers={"X-Forwarded-For": ip})
+
+
+def test_login_route_locks_out_by_forwarded_client_ip(client, make_user):
+    user = make_user(password="senha123")
+
+    statuses = [_login(client, user.email, "errada", "6.6.6.6").status_code for _ in range(6)]
+
+    assert statuses[-1] == 429
+    assert "Retry-After" in _login(client, user.email, "errada", "6.6.6.6").headers
+    # Atrás do roteador, o cliente vem do X-Forwarded-For: outro IP não é bloqueado
+    assert _login(client, user.email, "senha123", "1.1.1.1").status_code == 302
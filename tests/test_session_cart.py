@@ -0,0 +1,58 @@
+from flask import session
+
+import cart_service
+import session_cart
+
+
+def test_merge_on_login_adds_anonymous_items_to_saved_cart(app, make_user, make_product):
+    user = make_user()
+    camiseta, bone, caneca = make_product("Camiseta"), make_product("Boné"), make_product("Caneca")
+    cart_service.add_item(user.id, camiseta.id, 2)
+    cart_service.add_item(user.id, bone.id)
+
+    with app.test_request_context():
+        session_cart.add_item(camiseta.id, 3)
+        session_cart.add_item(caneca.id)
+
+        session_cart.merge_on_login(user.id)
+
+        expected = {camiseta.id: 5, bone.id: 1, caneca.id: 1}
+        assert session_cart.get_items() == expected
+        assert not session[session_cart.DIRTY_KEY]  # já gravado no banco
+    assert cart_service.get_items(user.id) == expected
+
+
+def test_merge_on_login_without_anonymous_cart_loads_saved_cart(app, make_user, make_product):
+    user = make_user()
+    camiseta = make_product("Camiseta")
+    cart_service.add_item(user.id, camiseta.id, 2)
+
+    with app.test_request_context():
+        session_cart.merge_on_login(user.id)
+
+        assert session_cart.get_items() == {camiseta.id: 2}
+        assert not session[session_cart.DIRTY_KEY]
+    assert cart_service.get_items(user.id) == {camiseta.id: 2}
+
+
+def test_merge_on_login_for_user_without_saved_cart(app, make_user, make_product):
+    user = make_user()
+    camiseta = make_product("Camiseta")
+
+    with app.test_request_context():
+        session_cart.add_item(camiseta.id, 2)
+        session_cart.merge_on_login(user.id)
+
+    assert cart_service.get_items(user.id) == {camiseta.id: 2}
+
+
+def test_login_merges_the_anonymous_cart(client, make_user, make_product):
+    user = make_user(password="senha123")
+    camiseta = make_product("Camiseta")
+    cart_service.add_item(user.id, camiseta.id)
+
+    client.post(f"/add-to-cart/{camiseta.id}")
+    response = client.post("/login", data={"email": user.email, "password": "senha123"})
+
+    assert response.status_code == 302
+    assert cart_service.get_items(user.id) == {camiseta.id: 2}